@@ -1,14 +1,32 @@
-from flask import Flask, request, jsonify, render_template
-from event_manager import EventManager
-from event import Event
-import threading
-import time
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, render_template, stream_with_context
+from collections import namedtuple
+from event_manager import ConflictError, EventManager
+from event import Event, naive_local
+from calendar_registry import ManagerRegistry, file_calendar_factory, is_valid_calendar_id
+from ical import iter_ics, parse_ics
+import metrics
+from notifications import EmailDispatcher, SMTPConnectionPool
+from reminders import ReminderScheduler
+from response_cache import ResponseCache
+from sqlite_event_manager import SQLiteEventManager
+from storage import JournalStorage
+import base64
+import io
+import itertools
+import json
+import os
 from datetime import datetime, timedelta
 import smtplib
-from email.mime.text import MIMEText
+import time
+
+# The events API; registered at / for the default calendar and at /calendars/<calendar_id> for the others
+bp = Blueprint('events', __name__)
+# The UI, metrics and debugging endpoints
+site = Blueprint('site', __name__)
 
-app = Flask(__name__)
-event_manager = EventManager()
+# Everything an app instance owns, kept in app.extensions['event_scheduler']
+Services = namedtuple('Services', ['event_manager', 'calendars', 'email_dispatcher', 'reminder_scheduler',
+                                   'response_cache', 'profiler'])
 
 # --- Email Notification Helper ---
 EMAIL_SENDER = 'your_email@gmail.com'  # Change to your email
@@ -16,60 +34,184 @@ EMAIL_PASSWORD = 'your_app_password'    # Use app password for Gmail
 SMTP_SERVER = 'smtp.gmail.com'
 SMTP_PORT = 587
 
-def send_email_notification(to_email, subject, body):
+def _smtp_connect():
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    server.starttls()
+    server.login(EMAIL_SENDER, EMAIL_PASSWORD)
+    return server
+
+def send_email_notification(email_dispatcher, to_email, subject, body):
     if not to_email:
         return
-    try:
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = EMAIL_SENDER
-        msg['To'] = to_email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_SENDER, [to_email], msg.as_string())
-    except Exception as e:
-        print(f"Failed to send email to {to_email}: {e}")
+    email_dispatcher.send(to_email, subject, body)
 
 # --- Reminder Feature (Bonus) ---
-def reminder_checker():
-    reminded = set()
-    while True:
-        now = datetime.now()
-        events = event_manager.get_all_events()
-        for event in events:
-            event_start_time = datetime.fromisoformat(event.start_time)
-            time_until_event = event_start_time - now
-            # Unique key for this occurrence
-            reminder_key = f"{event.id}:{event.start_time}"
-            if timedelta(0) < time_until_event <= timedelta(hours=1):
-                if reminder_key not in reminded:
-                    print(f"REMINDER: Event '{event.title}' is starting in {int(time_until_event.total_seconds() / 60)} minutes!")
-                    if event.email:
-                        send_email_notification(
-                            event.email,
-                            f"Reminder: {event.title}",
-                            f"Your event '{event.title}' is starting at {event.start_time}."
-                        )
-                    reminded.add(reminder_key)
-            elif time_until_event < timedelta(0):
-                reminded.discard(reminder_key)
-        time.sleep(60)
-
-reminder_thread = threading.Thread(target=reminder_checker, daemon=True)
-reminder_thread.start()
+def send_reminder(email_dispatcher, event, start, end):
+    minutes = int((start - datetime.now()).total_seconds() / 60)
+    print(f"REMINDER: Event '{event.title}' is starting in {minutes} minutes!")
+    if event.email:
+        send_email_notification(
+            email_dispatcher,
+            event.email,
+            f"Reminder: {event.title}",
+            f"Your event '{event.title}' is starting at {start.isoformat()}."
+        )
 # --- End Reminder Feature ---
 
-@app.route('/')
+def _default_event_manager():
+    # Set EVENTS_DB to a SQLite file to use the database backend instead of events.json
+    if os.environ.get('EVENTS_DB'):
+        return SQLiteEventManager(os.environ['EVENTS_DB'])
+    # EVENTS_BINARY_SNAPSHOT=1 keeps a marshal cache of events.json for faster starts
+    return EventManager(storage=JournalStorage('events.json', binary_snapshot=bool(os.environ.get('EVENTS_BINARY_SNAPSHOT'))))
+
+def _default_calendars():
+    # Each calendar gets its own file under EVENTS_CALENDARS_DIR (default: calendars/)
+    root = os.environ.get('EVENTS_CALENDARS_DIR', 'calendars')
+    return ManagerRegistry(file_calendar_factory(root, use_sqlite=bool(os.environ.get('EVENTS_DB'))))
+
+def create_app(event_manager=None, start_background=True, calendars=None):
+    """
+    Builds the Flask app and its services. event_manager serves the
+    top-level /events routes and calendars (a ManagerRegistry) serves
+    /calendars/<calendar_id>/events. Nothing runs in the background until
+    start_background_tasks(app) is called, which this does unless
+    start_background is False (as in tests and benchmarks).
+    """
+    app = Flask(__name__)
+    if event_manager is None:
+        event_manager = _default_event_manager()
+    if calendars is None:
+        calendars = _default_calendars()
+    # Emails are queued and sent by background workers over pooled SMTP connections
+    email_dispatcher = EmailDispatcher(SMTPConnectionPool(_smtp_connect), EMAIL_SENDER)
+    reminder_scheduler = ReminderScheduler(
+        event_manager, lambda event, start, end: send_reminder(email_dispatcher, event, start, end))
+    # Serialized GET responses keyed on the store version and the query string
+    response_cache = ResponseCache()
+    profiler = metrics.SamplingProfiler()
+    app.extensions['event_scheduler'] = Services(event_manager, calendars, email_dispatcher, reminder_scheduler,
+                                                 response_cache, profiler)
+    metrics.EMAIL_QUEUE_DEPTH.set_function(lambda: email_dispatcher.queue_depth)
+    metrics.REMINDERS_PENDING.set_function(lambda: reminder_scheduler.pending)
+    app.register_blueprint(site)
+    app.register_blueprint(bp)
+    app.register_blueprint(bp, url_prefix='/calendars/<calendar_id>', name='calendar_events')
+    if start_background:
+        start_background_tasks(app)
+    return app
+
+def start_background_tasks(app):
+    services = app.extensions['event_scheduler']
+    services.email_dispatcher.start()
+    services.reminder_scheduler.start()
+    # Set EVENTS_PROFILE=1 to sample stacks in the background; read them at /debug/profile
+    if os.environ.get('EVENTS_PROFILE'):
+        services.profiler.start()
+
+def stop_background_tasks(app):
+    services = app.extensions['event_scheduler']
+    services.reminder_scheduler.stop()
+    services.email_dispatcher.stop()
+    services.profiler.stop()
+
+def _services():
+    return current_app.extensions['event_scheduler']
+
+def _manager():
+    # The calendar named in the URL, if any, else the default store
+    return g.get('event_manager') or _services().event_manager
+
+# --- Calendars ---
+@bp.url_value_preprocessor
+def _pull_calendar_id(endpoint, values):
+    g.calendar_id = values.pop('calendar_id', None) if values else None
+
+@bp.before_request
+def _open_calendar():
+    calendar_id = g.calendar_id
+    if calendar_id is None:
+        return None
+    if not is_valid_calendar_id(calendar_id):
+        return jsonify({"error": "Calendar ids may only contain letters, digits, '-' and '_'."}), 400
+    # Only a POST creates a calendar, so reads of a mistyped id don't leave files behind.
+    # Held until the request (including a streamed body) is done, so it isn't evicted mid-use.
+    manager = _services().calendars.acquire(calendar_id, create=request.method == 'POST')
+    if manager is None:
+        return jsonify({"error": "Calendar not found"}), 404
+    g.event_manager = manager
+
+@bp.teardown_request
+def _close_calendar(exc):
+    if g.pop('event_manager', None) is not None:
+        _services().calendars.release(g.calendar_id)
+
+def _check_email(data):
+    # Reminders are only scheduled for the default store, so a calendar event can't ask for one
+    if g.calendar_id is not None and data.get('email'):
+        raise ValueError("Email reminders are only sent for events outside /calendars.")
+
+@site.before_app_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@site.after_app_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None and metrics.REGISTRY.enabled:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+        metrics.HTTP_REQUESTS_TOTAL.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    return response
+
+@site.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@site.route('/debug/profile', methods=['GET'])
+def get_profile():
+    profiler = _services().profiler
+    if not profiler.running:
+        return jsonify({"error": "Profiler is not running; start the app with EVENTS_PROFILE=1."}), 404
+    return Response(profiler.collapsed(), mimetype='text/plain')
+
+# --- Response caching ---
+def _cached_json(build):
+    """
+    Serves build()'s JSON from the response cache, with an ETag so a
+    client that already has the body gets a 304. build returns the list of
+    events to serialize, or a (payload, events) pair when the payload isn't
+    the plain list, or None when there is nothing to serve (not cached).
+    """
+    # Read the version before building, so an entry is never newer-keyed than its data
+    key = (request.endpoint, g.get('calendar_id'), tuple(sorted(request.view_args.items())),
+           tuple(sorted(request.args.items(multi=True))), _manager().version)
+    now = datetime.now()
+    response_cache = _services().response_cache
+    entry = response_cache.get(key, now)
+    if entry is None:
+        result = build()
+        if result is None:
+            return None
+        payload, events = result if isinstance(result, tuple) else ([e.to_dict() for e in result], result)
+        # A recurring event shown at its next occurrence changes once that occurrence starts
+        expires = min((e.start for e in events if e.recurrence != 'none' and e.start > now), default=None)
+        entry = response_cache.put(key, jsonify(payload).get_data(), expires)
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    return response.make_conditional(request)
+
+@site.route('/')
 def serve_index():
     return render_template('index.html')
 
-@app.route('/events', methods=['POST'])
+@bp.route('/events', methods=['POST'])
 def create_event():
     data = request.get_json()
     if not data:
         return jsonify({"error": "Request must contain JSON data."}), 400
     try:
+        _check_email(data)
         new_event = Event(
             title=data.get('title'),
             description=data.get('description'),
@@ -78,32 +220,167 @@ def create_event():
             recurrence=data.get('recurrence', 'none'),
             email=data.get('email')
         )
-        event_manager.add_event(new_event)
+        # ?reject_conflicts=true refuses an event overlapping an existing one
+        reject_conflicts = request.args.get('reject_conflicts', '').lower() in ('1', 'true', 'yes')
+        _manager().add_event(new_event, reject_conflicts=reject_conflicts)
         return jsonify(new_event.to_dict()), 201
+    except ConflictError as e:
+        return jsonify({"error": str(e), "conflicts": [event.to_dict() for event in e.conflicts]}), 409
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred: " + str(e)}), 500
 
-@app.route('/events', methods=['GET'])
+# --- Time-range listing ---
+RANGE_PARAMS = ('from', 'to', 'limit', 'cursor')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _parse_time_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return naive_local(datetime.fromisoformat(value))
+    except (ValueError, OverflowError):
+        raise ValueError(f"'{name}' must be a valid ISO 8601 datetime string.")
+
+def _parse_limit():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("'limit' must be an integer.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+def _encode_cursor(event):
+    raw = f"{event.start_time}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        start_time, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return (naive_local(datetime.fromisoformat(start_time)), event_id)
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid cursor.")
+
+def _get_events_in_range():
+    try:
+        window_start = _parse_time_arg('from')
+        window_end = _parse_time_arg('to')
+        limit = _parse_limit()
+        after_key = _decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if window_start and window_end and window_start >= window_end:
+        return jsonify({"error": "'from' must be before 'to'."}), 400
+
+    def build():
+        # Fetch one extra item to know whether another page exists
+        page = list(itertools.islice(_manager().iter_range(window_start, window_end, after_key), limit + 1))
+        next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+        # An explicit window doesn't depend on the current time, so never expires
+        return {"events": [event.to_dict() for event in page[:limit]], "next_cursor": next_cursor}, []
+    return _cached_json(build)
+
+# --- Streaming ---
+NDJSON_TYPE = 'application/x-ndjson'
+STREAM_CHUNK_SIZE = 64 * 1024
+# Widest window a streamed range may cover when no limit is given
+MAX_STREAM_WINDOW = timedelta(days=366)
+
+def _stream_format():
+    # ?stream=json or ?stream=ndjson, or an Accept header asking for NDJSON; None for a buffered response
+    fmt = request.args.get('stream')
+    if fmt is None and request.accept_mimetypes.best == NDJSON_TYPE:
+        fmt = 'ndjson'
+    if fmt not in (None, 'json', 'ndjson'):
+        raise ValueError("'stream' must be 'json' or 'ndjson'.")
+    return fmt
+
+def _chunks(parts):
+    # Coalesce small pieces into chunks of about STREAM_CHUNK_SIZE characters
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def _json_array(events):
+    yield '['
+    for i, event in enumerate(events):
+        yield (',' if i else '') + json.dumps(event.to_dict())
+    yield ']\n'
+
+def _streamed(events, fmt):
+    """
+    Sends events as they come off the iterator, as one JSON array or as
+    NDJSON, so memory use and time to first byte don't grow with the result.
+    """
+    if fmt == 'ndjson':
+        parts, mimetype = (json.dumps(event.to_dict()) + '\n' for event in events), NDJSON_TYPE
+    else:
+        parts, mimetype = _json_array(events), 'application/json'
+    # stream_with_context keeps the request (and its calendar) open until the body is sent
+    return Response(stream_with_context(_chunks(parts)), mimetype=mimetype)
+
+def _stream_events_in_range(fmt):
+    try:
+        window_start = _parse_time_arg('from')
+        window_end = _parse_time_arg('to')
+        after_key = _decode_cursor(request.args.get('cursor'))
+        limit = _parse_limit() if 'limit' in request.args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if window_start and window_end and window_start >= window_end:
+        return jsonify({"error": "'from' must be before 'to'."}), 400
+    # Daily series never run out, so an open-ended window would stream forever
+    if limit is None and (not window_start or not window_end or window_end - window_start > MAX_STREAM_WINDOW):
+        return jsonify({"error": f"Streaming a time range needs 'limit', or 'from' and 'to' at most "
+                                 f"{MAX_STREAM_WINDOW.days} days apart."}), 400
+    # Streamed windows aren't paged; limit, if given, caps the total
+    events = _manager().iter_range(window_start, window_end, after_key)
+    return _streamed(itertools.islice(events, limit), fmt)
+
+@bp.route('/events', methods=['GET'])
 def get_events():
-    events = event_manager.get_all_events()
-    return jsonify([event.to_dict() for event in events]), 200
+    try:
+        fmt = _stream_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ranged = any(name in request.args for name in RANGE_PARAMS)
+    if fmt:
+        return _stream_events_in_range(fmt) if ranged else _streamed(_manager().iter_all_events(), fmt)
+    if ranged:
+        return _get_events_in_range()
+    return _cached_json(_manager().get_all_events)
 
-@app.route('/events/<event_id>', methods=['GET'])
+@bp.route('/events/<event_id>', methods=['GET'])
 def get_event_by_id(event_id):
-    event = event_manager.get_event(event_id)
-    if event:
-        return jsonify(event.to_dict()), 200
+    def build():
+        event = _manager().get_event(event_id)
+        # Stored events are unexpanded, so the body never expires
+        return (event.to_dict(), []) if event else None
+    response = _cached_json(build)
+    if response:
+        return response
     return jsonify({"error": "Event not found"}), 404
 
-@app.route('/events/<event_id>', methods=['PUT'])
+@bp.route('/events/<event_id>', methods=['PUT'])
 def update_event(event_id):
     data = request.get_json()
     if not data:
         return jsonify({"error": "Request must contain JSON data."}), 400
     try:
-        updated_event = event_manager.update_event(event_id, data)
+        _check_email(data)
+        updated_event = _manager().update_event(event_id, data)
         if updated_event:
             return jsonify(updated_event.to_dict()), 200
         return jsonify({"error": "Event not found"}), 404
@@ -112,23 +389,131 @@ def update_event(event_id):
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred: " + str(e)}), 500
 
-@app.route('/events/<event_id>', methods=['DELETE'])
+@bp.route('/events/<event_id>', methods=['DELETE'])
 def delete_event(event_id):
-    if event_manager.delete_event(event_id):
+    if _manager().delete_event(event_id):
         return jsonify({"message": "Event deleted successfully"}), 200
     return jsonify({"error": "Event not found"}), 404
 
-@app.route('/events/search', methods=['GET'])
+@bp.route('/events/search', methods=['GET'])
 def search_events():
-    query = request.args.get('query', '').lower()
+    query = request.args.get('query', '')
     if not query:
         return jsonify({"error": "Query parameter is required for search."}), 400
-    matching_events = []
-    events = event_manager.get_all_events()
-    for event in events:
-        if query in event.title.lower() or query in event.description.lower():
-            matching_events.append(event.to_dict())
-    return jsonify(matching_events), 200
+    try:
+        fmt = _stream_format()
+        # Without a limit every match is returned, as before limits existed
+        limit = _parse_limit() if 'limit' in request.args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt:
+        return _streamed(_manager().iter_search(query, limit=limit), fmt)
+    return _cached_json(lambda: _manager().search(query, limit=limit))
+
+# --- Conflicts and free slots ---
+def _parse_window():
+    window_start = _parse_time_arg('from')
+    window_end = _parse_time_arg('to')
+    if not window_start or not window_end:
+        raise ValueError("'from' and 'to' are required.")
+    if window_start >= window_end:
+        raise ValueError("'from' must be before 'to'.")
+    return window_start, window_end
+
+@bp.route('/events/conflicts', methods=['GET'])
+def get_conflicts():
+    try:
+        window_start, window_end = _parse_window()
+        limit = _parse_limit()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    conflicts = _manager().find_conflicts(window_start, window_end, limit=limit)
+    return jsonify([[first.to_dict(), second.to_dict()] for first, second in conflicts]), 200
+
+@bp.route('/events/free-slots', methods=['GET'])
+def get_free_slots():
+    try:
+        window_start, window_end = _parse_window()
+        limit = _parse_limit()
+        try:
+            minutes = int(request.args.get('duration', ''))
+        except ValueError:
+            raise ValueError("'duration' must be a whole number of minutes.")
+        if minutes < 1:
+            raise ValueError("'duration' must be at least 1 minute.")
+        try:
+            duration = timedelta(minutes=minutes)
+        except OverflowError:
+            raise ValueError("'duration' is too large.")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    slots = _manager().find_free_slots(duration, window_start, window_end, limit=limit)
+    return jsonify([{"start_time": start.isoformat(), "end_time": end.isoformat()} for start, end in slots]), 200
+
+# --- Bulk import/export ---
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+ICS_TYPE = 'text/calendar'
+MAX_REPORTED_ERRORS = 100
+
+def _import_records(lines, fmt):
+    # Yields (record_number, event_dict) from the request body, one record at a time
+    if fmt == 'ics':
+        yield from enumerate(parse_ics(lines), start=1)
+        return
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e.msg}).")
+
+@bp.route('/events/bulk', methods=['POST'])
+def bulk_import_events():
+    content_type = request.mimetype
+    if content_type in NDJSON_TYPES:
+        fmt = 'ndjson'
+    elif content_type == ICS_TYPE:
+        fmt = 'ics'
+    else:
+        return jsonify({"error": "Content-Type must be application/x-ndjson or text/calendar."}), 415
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8')
+    events = []
+    errors = []
+    try:
+        for number, data in _import_records(lines, fmt):
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError("Each record must be a JSON object.")
+                _check_email(data)
+                events.append(Event.from_dict(data))
+            except (ValueError, TypeError) as e:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"record": number, "error": str(e)})
+                else:
+                    break
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if errors:
+        # All or nothing: a rejected import leaves the store untouched
+        return jsonify({"error": "Import rejected; no events were added.", "errors": errors}), 400
+    _manager().add_events(events)
+    return jsonify({"imported": len(events)}), 201
+
+@bp.route('/events/export', methods=['GET'])
+def export_events():
+    fmt = request.args.get('format', 'ndjson')
+    events = _manager().iter_events()
+    if fmt == 'ndjson':
+        body = (json.dumps(event.to_dict()) + '\n' for event in events)
+        mimetype, filename = NDJSON_TYPE, 'events.ndjson'
+    elif fmt == 'ics':
+        body = iter_ics(events)
+        mimetype, filename = ICS_TYPE, 'events.ics'
+    else:
+        return jsonify({"error": "format must be 'ndjson' or 'ics'."}), 400
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
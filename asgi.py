@@ -0,0 +1,25 @@
+"""
+ASGI serving mode: the same Flask routes behind asgiref's WSGI adapter, for
+ASGI servers such as uvicorn. asgiref is only needed for this mode:
+
+    pip install asgiref uvicorn
+    uvicorn --factory asgi:create_asgi_app
+
+Request large listings with ?stream=ndjson (or ?stream=json) so they are
+sent while they are produced instead of being built in memory first.
+"""
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+from app import create_app
+
+
+def create_asgi_app(*args, **kwargs):
+    """
+    Builds the Flask app with create_app(*args, **kwargs) and wraps it as
+    an ASGI application.
+    """
+    if WsgiToAsgi is None:
+        raise ImportError("ASGI mode needs asgiref: pip install asgiref")
+    return WsgiToAsgi(create_app(*args, **kwargs))
@@ -0,0 +1,254 @@
+"""
+Benchmarks for EventManager, recurrence expansion and the Flask routes.
+
+Generates a synthetic calendar for each requested size, times every
+operation and prints (or writes) machine-readable JSON with throughput,
+p50/p99 latency and peak traced memory per operation. Runs are seeded, so
+two commits can be compared on identical data:
+
+    python benchmark.py --sizes 1000,100000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from event import Event
+from event_manager import EventManager
+from occurrence_cache import OccurrenceCache
+from storage import JournalStorage, _write_snapshot
+
+BASE_TIME = datetime(2030, 1, 1, 9, 0)
+WORDS = ["team", "meeting", "review", "planning", "standup", "lunch", "budget", "design",
+         "release", "sync", "retro", "demo", "interview", "training", "offsite", "call"]
+DEFAULT_MIX = "none=0.7,daily=0.1,weekly=0.1,monthly=0.1"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, weight = part.split('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def generate_events(count, mix, seed=0):
+    rng = random.Random(seed)
+    recurrences = list(mix)
+    weights = [mix[name] for name in recurrences]
+    events = []
+    for i in range(count):
+        start = BASE_TIME + timedelta(minutes=rng.randrange(-365 * 24 * 4, 365 * 24 * 4) * 15)
+        end = start + timedelta(minutes=rng.choice((15, 30, 60, 90, 180)))
+        events.append(Event(
+            title=" ".join(rng.sample(WORDS, 2)).capitalize(),
+            description=" ".join(rng.sample(WORDS, 5)),
+            start_time=start.isoformat(),
+            end_time=end.isoformat(),
+            event_id=f"bench-{i}",
+            recurrence=rng.choices(recurrences, weights)[0],
+        ))
+    return events
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, size, operation, repeat):
+    """
+    Times operation(i) for i in range(repeat), then reruns it once under
+    tracemalloc for the peak memory, so tracing doesn't skew the latencies.
+    """
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - started)
+    tracemalloc.start()
+    operation(repeat)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "size": size,
+        "operation": name,
+        "runs": repeat,
+        "throughput_per_s": repeat / total if total else None,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_memory_bytes": peak,
+    }
+
+
+def _pinned_occurrence_cache():
+    # The generated calendar sits around BASE_TIME, so that is "now" for the occurrence cache
+    return OccurrenceCache(clock=lambda: BASE_TIME)
+
+
+def _manager_operations(manager, events, rng):
+    sample_ids = [event.id for event in rng.sample(events, min(len(events), 1000))]
+    recurring = [event for event in events if event.recurrence != 'none'] or events
+    window = (BASE_TIME, BASE_TIME + timedelta(days=31))
+
+    def add(i):
+        start = BASE_TIME + timedelta(days=i % 365)
+        manager.add_event(Event("Added", "bench", start.isoformat(), (start + timedelta(hours=1)).isoformat(),
+                                event_id=f"added-{i}"))
+
+    def update(i):
+        manager.update_event(sample_ids[i % len(sample_ids)], {"title": f"Updated {i}"})
+
+    def delete(i):
+        manager.delete_event(f"added-{i}")
+
+    # Next occurrence of every series: computed directly, through a fresh cache, and through a warm one
+    def expand_direct(i):
+        for event in recurring:
+            occ = event.next_occurrence(BASE_TIME)
+            if occ:
+                event.with_times(*occ)
+
+    def expand_cold(i):
+        cache = _pinned_occurrence_cache()
+        for event in recurring:
+            cache.next_occurrence(event, BASE_TIME)
+
+    warm = _pinned_occurrence_cache()
+
+    def expand_warm(i):
+        for event in recurring:
+            warm.next_occurrence(event, BASE_TIME)
+
+    return [
+        ("manager.add_event", add),
+        ("manager.get_event", lambda i: manager.get_event(sample_ids[i % len(sample_ids)])),
+        ("manager.update_event", update),
+        ("manager.get_all_events", lambda i: manager.get_all_events(after=BASE_TIME)),
+        ("manager.get_events_between", lambda i: manager.get_events_between(*window)),
+        ("manager.search", lambda i: manager.search(WORDS[i % len(WORDS)], limit=100, after=BASE_TIME)),
+        ("event.next_occurrence", lambda i: recurring[i % len(recurring)].next_occurrence(BASE_TIME + timedelta(days=3650))),
+        ("series.next_occurrence.direct", expand_direct),
+        ("series.next_occurrence.cache_cold", expand_cold),
+        ("series.next_occurrence.cache_warm", expand_warm),
+        ("manager.delete_event", delete),
+        ("manager._save_events", lambda i: manager._save_events()),
+    ]
+
+
+def _route_operations(client, response_cache, events, rng):
+    sample_ids = [event.id for event in rng.sample(events, min(len(events), 1000))]
+    listing = '/events'
+    window = '/events?from=2030-01-01T00:00:00&to=2030-02-01T00:00:00&limit=1000'
+
+    def search(i):
+        return f'/events/search?query={WORDS[i % len(WORDS)]}'
+
+    def uncached(url):
+        # Every run misses the response cache, so this times building the response
+        def get(i):
+            response_cache.clear()
+            client.get(url(i))
+        return get
+
+    def cached(url):
+        # Primed here, so every timed run is a cache hit
+        client.get(url)
+        return lambda i: client.get(url)
+
+    def create(i):
+        start = BASE_TIME + timedelta(days=i % 365)
+        client.post('/events', json={"title": "Posted", "start_time": start.isoformat(),
+                                     "end_time": (start + timedelta(hours=1)).isoformat()})
+
+    # The cached operations run first, before the others clear the cache or change the store
+    return [
+        ("GET /events (cached)", cached(listing)),
+        ("GET /events/search (cached)", cached(search(0))),
+        ("GET /events", uncached(lambda i: listing)),
+        ("GET /events?from&to", uncached(lambda i: window)),
+        ("GET /events/<id>", uncached(lambda i: f'/events/{sample_ids[i % len(sample_ids)]}')),
+        ("GET /events/search", uncached(search)),
+        ("POST /events", create),
+    ]
+
+
+def _measure_routes(manager, events, rng, size, repeat):
+    from app import create_app
+    app = create_app(manager, start_background=False)
+    operations = _route_operations(app.test_client(), app.extensions['event_scheduler'].response_cache, events, rng)
+    return [measure(name, size, operation, repeat) for name, operation in operations]
+
+
+def run_benchmarks(sizes, mix, repeat=20, seed=0, routes=True, fsync=True):
+    results = []
+    for size in sizes:
+        events = generate_events(size, mix, seed)
+        workdir = tempfile.mkdtemp(prefix='event-bench-')
+        try:
+            path = os.path.join(workdir, 'events.json')
+            _write_snapshot(path, [event.to_dict() for event in events])
+            results.append(measure("manager.load", size,
+                                   lambda i: EventManager(path, storage=JournalStorage(path, fsync=fsync)), 1))
+            manager = EventManager(path, storage=JournalStorage(path, fsync=fsync))
+            manager._occurrences = _pinned_occurrence_cache()
+            rng = random.Random(seed)
+            for name, operation in _manager_operations(manager, events, rng):
+                results.append(measure(name, size, operation, repeat))
+            if routes:
+                results.extend(_measure_routes(manager, events, rng, size, repeat))
+            manager.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help="comma-separated calendar sizes")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="recurrence weights, e.g. none=0.7,daily=0.3")
+    parser.add_argument('--repeat', type=int, default=20, help="timed runs per operation")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-routes', action='store_true', help="skip the Flask route benchmarks")
+    parser.add_argument('--no-fsync', action='store_true', help="don't fsync journal appends")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(),
+            "args": vars(args),
+        },
+        "results": run_benchmarks(sizes, parse_mix(args.mix), args.repeat, args.seed,
+                                  routes=not args.no_routes, fsync=not args.no_fsync),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from event_manager import EventManager
+from sqlite_event_manager import SQLiteEventManager
+
+# Calendar ids become file names, so keep them to a safe alphabet
+CALENDAR_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+MAX_OPEN_CALENDARS = 32
+
+
+def is_valid_calendar_id(calendar_id):
+    return bool(CALENDAR_ID_RE.fullmatch(calendar_id))
+
+
+def file_calendar_factory(root, use_sqlite=False):
+    """
+    Returns a factory that stores calendar <id> in <root>/<id>.json (with its
+    own journal), or in <root>/<id>.db when use_sqlite is set. With
+    create=False the factory returns None for a calendar that has no file yet.
+    """
+    def open_calendar(calendar_id, create=True):
+        if not is_valid_calendar_id(calendar_id):
+            raise ValueError(f"Invalid calendar id: {calendar_id!r}")
+        path = os.path.join(root, f"{calendar_id}.db" if use_sqlite else f"{calendar_id}.json")
+        if not create and not os.path.exists(path):
+            return None
+        os.makedirs(root, exist_ok=True)
+        if use_sqlite:
+            return SQLiteEventManager(path)
+        return EventManager(path)
+    return open_calendar
+
+
+class _Slot:
+    # A calendar's place in the registry; ready is set once manager is loaded (or failed to load, leaving None)
+    __slots__ = ('manager', 'ready')
+
+    def __init__(self):
+        self.manager = None
+        self.ready = threading.Event()
+
+
+class ManagerRegistry:
+    """
+    One independently indexed and persisted EventManager per calendar.
+
+    Managers are opened on first use and at most max_open are kept; when
+    another is needed the least recently used idle one is closed (which
+    compacts its journal). A manager between acquire() and release() is
+    never closed, so the limit can be exceeded briefly under load.
+
+    Loading and closing happen outside the registry lock, so a slow open or
+    compaction only holds up requests for that one calendar. A calendar that
+    is still being closed is reopened only once the close has finished.
+    """
+
+    def __init__(self, factory, max_open=MAX_OPEN_CALENDARS):
+        # factory(calendar_id, create) returns a manager, or None if create is False and there is none
+        self._factory = factory
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # calendar_id -> _Slot, least recently used first
+        self._in_use = Counter()     # calendar_id -> outstanding acquire() calls
+        self._closing = {}           # calendar_id -> threading.Event set once its evicted manager is closed
+
+    def acquire(self, calendar_id, create=True):
+        """
+        Returns the calendar's manager, opening it if needed, and keeps it
+        open until release(). With create=False a calendar that doesn't exist
+        yet isn't created; None is returned instead (and nothing to release).
+        """
+        while True:
+            with self._lock:
+                slot = self._slots.get(calendar_id)
+                opening = slot is None
+                if opening:
+                    slot = self._slots[calendar_id] = _Slot()
+                    closing = self._closing.get(calendar_id)
+                self._slots.move_to_end(calendar_id)
+                self._in_use[calendar_id] += 1
+            if opening:
+                try:
+                    self._load(calendar_id, slot, closing, create)
+                except BaseException:
+                    self._unpin(calendar_id)
+                    raise
+            else:
+                slot.ready.wait()
+            if slot.manager is not None:
+                self._close_all(self._evict_idle())
+                return slot.manager
+            self._unpin(calendar_id)
+            if opening or not create:
+                return None
+            # Whoever opened it didn't create it (or failed); try again ourselves
+
+    def release(self, calendar_id):
+        self._unpin(calendar_id)
+        self._close_all(self._evict_idle())
+
+    @contextmanager
+    def open(self, calendar_id):
+        manager = self.acquire(calendar_id)
+        try:
+            yield manager
+        finally:
+            self.release(calendar_id)
+
+    def close(self):
+        with self._lock:
+            slots = list(self._slots.values())
+            self._slots.clear()
+            closing = list(self._closing.values())
+        for slot in slots:
+            slot.ready.wait()
+            if slot.manager is not None:
+                slot.manager.close()
+        for done in closing:
+            done.wait()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, calendar_id):
+        return calendar_id in self._slots
+
+    def _load(self, calendar_id, slot, closing, create):
+        # Runs without the lock; other acquirers of calendar_id wait on slot.ready
+        if closing is not None:
+            closing.wait()
+        try:
+            slot.manager = self._factory(calendar_id, create=create)
+        finally:
+            if slot.manager is None:
+                with self._lock:
+                    if self._slots.get(calendar_id) is slot:
+                        del self._slots[calendar_id]
+            slot.ready.set()
+
+    def _unpin(self, calendar_id):
+        with self._lock:
+            self._in_use[calendar_id] -= 1
+            if self._in_use[calendar_id] <= 0:
+                del self._in_use[calendar_id]
+
+    def _evict_idle(self):
+        # Takes least recently used idle calendars out of the registry; the caller closes them
+        evicted = []
+        with self._lock:
+            for calendar_id in list(self._slots):
+                if len(self._slots) <= self.max_open:
+                    break
+                if calendar_id not in self._in_use:
+                    slot = self._slots.pop(calendar_id)
+                    done = self._closing[calendar_id] = threading.Event()
+                    evicted.append((calendar_id, slot.manager, done))
+        return evicted
+
+    def _close_all(self, evicted):
+        for calendar_id, manager, done in evicted:
+            try:
+                manager.close()
+            finally:
+                with self._lock:
+                    if self._closing.get(calendar_id) is done:
+                        del self._closing[calendar_id]
+                done.set()
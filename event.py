@@ -1,27 +1,96 @@
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
+import recurrence as recurrence_rules
+
+def naive_local(moment):
+    # Stored times are naive local time; convert a value with a UTC offset to match, as ical.py does
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone().replace(tzinfo=None)
 
 class Event:
+    # Times are kept as parsed datetimes; the ISO strings are rendered once on demand
+    __slots__ = ('id', 'title', 'description', 'recurrence', 'email', '_start', '_end', '_start_iso', '_end_iso')
+
     def __init__(self, title, description, start_time, end_time, event_id=None, recurrence='none', email=None):
         if not title or not start_time or not end_time:
             raise ValueError("Title, start time, and end time are required.")
+        # Ids are compared with each other in the time index and used in URLs, so they must be strings
+        if event_id is not None and not isinstance(event_id, str):
+            raise ValueError("Event id must be a string.")
 
         try:
             # Ensure times are in ISO 8601 format and valid
-            self.start_time = datetime.fromisoformat(start_time).isoformat()
-            self.end_time = datetime.fromisoformat(end_time).isoformat()
-        except ValueError:
+            start = naive_local(datetime.fromisoformat(start_time))
+            end = naive_local(datetime.fromisoformat(end_time))
+        except (ValueError, OverflowError):
             raise ValueError("Start time and end time must be valid ISO 8601 datetime strings (e.g., YYYY-MM-DDTHH:MM:SS).")
 
-        if datetime.fromisoformat(self.start_time) >= datetime.fromisoformat(self.end_time):
+        if start >= end:
             raise ValueError("Start time must be before end time.")
 
+        self.start = start
+        self.end = end
         self.id = event_id if event_id else str(uuid.uuid4())
         self.title = title
         self.description = description if description is not None else ""
         self.recurrence = recurrence  # 'none', 'daily', 'weekly', 'monthly'
         self.email = email
 
+    @property
+    def start(self):
+        return self._start
+
+    @start.setter
+    def start(self, value):
+        self._start = value
+        self._start_iso = None
+
+    @property
+    def end(self):
+        return self._end
+
+    @end.setter
+    def end(self, value):
+        self._end = value
+        self._end_iso = None
+
+    @property
+    def start_time(self):
+        if self._start_iso is None:
+            self._start_iso = self._start.isoformat()
+        return self._start_iso
+
+    @start_time.setter
+    def start_time(self, value):
+        self.start = naive_local(datetime.fromisoformat(value))
+
+    @property
+    def end_time(self):
+        if self._end_iso is None:
+            self._end_iso = self._end.isoformat()
+        return self._end_iso
+
+    @end_time.setter
+    def end_time(self, value):
+        self.end = naive_local(datetime.fromisoformat(value))
+
+    def with_times(self, start, end):
+        """
+        Returns a copy of this event moved to [start, end), e.g. one occurrence
+        of a recurring series. The caller guarantees start < end, so the
+        constructor's validation is skipped.
+        """
+        copy = Event.__new__(Event)
+        copy.id = self.id
+        copy.title = self.title
+        copy.description = self.description
+        copy.recurrence = self.recurrence
+        copy.email = self.email
+        copy.start = start
+        copy.end = end
+        return copy
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -34,7 +103,24 @@ class Event:
         }
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, validate=True):
+        if not validate:
+            # For records this app wrote itself, which were validated on the way in
+            event = cls.__new__(cls)
+            event.id = data["id"]
+            event.title = data["title"]
+            event.description = data.get("description") or ""
+            event.recurrence = data.get("recurrence", 'none')
+            event.email = data.get("email")
+            # Set the slots directly; this is the hot path when loading a large file
+            event._start = datetime.fromisoformat(data["start_time"])
+            event._end = datetime.fromisoformat(data["end_time"])
+            if event._start.tzinfo is not None or event._end.tzinfo is not None:
+                # Written before offsets were converted on the way in; store it in local time like the rest
+                event._start = naive_local(event._start)
+                event._end = naive_local(event._end)
+            event._start_iso = event._end_iso = None
+            return event
         return cls(
             event_id=data.get("id"),
             title=data.get("title"),
@@ -51,24 +137,11 @@ class Event:
         Returns None if no next occurrence.
         """
         after = after or datetime.now()
-        start = datetime.fromisoformat(self.start_time)
-        end = datetime.fromisoformat(self.end_time)
-        if self.recurrence == 'none':
-            if start > after:
-                return (start, end)
-            return None
-        # For recurring events, find the next occurrence after 'after'
-        while start <= after:
-            if self.recurrence == 'daily':
-                start += timedelta(days=1)
-                end += timedelta(days=1)
-            elif self.recurrence == 'weekly':
-                start += timedelta(weeks=1)
-                end += timedelta(weeks=1)
-            elif self.recurrence == 'monthly':
-                # Simple monthly increment: add 30 days
-                start += timedelta(days=30)
-                end += timedelta(days=30)
-            else:
-                break
-        return (start, end) if start > after else None
\ No newline at end of file
+        return recurrence_rules.next_occurrence(self._start, self._end, self.recurrence, after)
+
+    def occurrences(self, window_start=None, window_end=None):
+        """
+        Yields (start_time, end_time) datetime pairs for each occurrence overlapping
+        [window_start, window_end), in start order. Either bound may be None.
+        """
+        return recurrence_rules.occurrences(self._start, self._end, self.recurrence, window_start, window_end)
@@ -1,94 +1,440 @@
-import json
-from datetime import datetime
-from event import Event # Assuming event.py is in the same directory
+import bisect
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from event import Event, naive_local # Assuming event.py is in the same directory
+from metrics import EVENT_MANAGER_SECONDS
+from occurrence_cache import OccurrenceCache
+from recurrence import earlier
+from search_index import SearchIndex
+from storage import JournalStorage
+
+# Immutable view of the time indexes handed to readers
+_Snapshot = namedtuple('_Snapshot', ['starts', 'recurring', 'by_duration'])
+
+# Shared by all managers, so a version never means two different states
+_versions = itertools.count(1)
+
+# How far ahead a new recurring series is checked for conflicts
+CONFLICT_HORIZON = timedelta(days=90)
+
+def _duration_class(event):
+    # One-off events are grouped by duration rounded up to a power of two seconds, so a
+    # window scan only reaches back as far as the longest possible event of each group
+    duration = event.end - event.start
+    seconds = duration.days * 86400 + duration.seconds + (1 if duration.microseconds else 0)
+    return max(0, (seconds - 1).bit_length())
+
+class ConflictError(ValueError):
+    def __init__(self, conflicts):
+        super().__init__("Event conflicts with existing events.")
+        self.conflicts = conflicts
 
 class EventManager:
-    def __init__(self, storage_file='events.json'):
+    """
+    Thread-safe event store.
+
+    Writers are serialized by a lock. Stored Event objects are never mutated
+    (an update stores a new object), and readers iterate a copy-on-write
+    snapshot of the time indexes, so GET paths don't block on writers and
+    never see a half-applied change. The snapshot is copied at most once per
+    write, on the first read after it.
+    """
+
+    def __init__(self, storage_file='events.json', storage=None):
         self.storage_file = storage_file
-        self.events = self._load_events()
+        # Default to the append-only journal; pass JsonFileStorage to rewrite the file on every change
+        self.storage = storage if storage is not None else JournalStorage(storage_file)
+        self._write_lock = threading.RLock()
+        self._by_id = {}          # id -> Event, in insertion order
+        self._starts = []         # sorted (start, id, event) for non-recurring events
+        self._recurring = {}      # id -> Event for recurring series
+        self._by_duration = {}    # duration class -> sorted (start, id, event), for windowed scans
+        self._search_index = None   # built on the first search, so startup doesn't tokenize everything
+        self._occurrences = OccurrenceCache()
+        self._listeners = []
+        self._published = None    # current _Snapshot, or None after a write
+        self.version = next(_versions)  # changes on every write
+        self._put_all(self._load_events())
+        # Runs on the compaction thread; list() of a dict is atomic and events are immutable
+        self.storage.attach(lambda: [event.to_dict() for event in list(self._by_id.values())])
+
+    @property
+    def events(self):
+        with self._write_lock:
+            return list(self._by_id.values())
 
+    @EVENT_MANAGER_SECONDS.timed(operation='load')
     def _load_events(self):
-        try:
-            with open(self.storage_file, 'r') as f:
-                data = json.load(f)
-                # Convert dictionary data back into Event objects
-                return [Event.from_dict(item) for item in data]
-        except FileNotFoundError:
-            return []
-        except json.JSONDecodeError:
-            # Handle empty or corrupted JSON files
-            return []
+        # Convert dictionary data back into Event objects; stored records were validated when written
+        return [Event.from_dict(item, validate=False) for item in self.storage.load()]
 
+    @EVENT_MANAGER_SECONDS.timed(operation='save')
     def _save_events(self):
-        with open(self.storage_file, 'w') as f:
-            # Convert Event objects to dictionaries for JSON serialization
-            json.dump([event.to_dict() for event in self.events], f, indent=4)
+        # Full rewrite of the persisted state (compacts the journal)
+        with self._write_lock:
+            self.storage.save_all([event.to_dict() for event in self._by_id.values()])
+
+    def _snapshot(self):
+        snapshot = self._published
+        if snapshot is None:
+            with self._write_lock:
+                snapshot = self._published
+                if snapshot is None:
+                    by_duration = [(timedelta(seconds=1 << duration_class), list(starts))
+                                   for duration_class, starts in self._by_duration.items()]
+                    snapshot = _Snapshot(list(self._starts), list(self._recurring.values()), by_duration)
+                    self._published = snapshot
+        return snapshot
+
+    def _searchable(self):
+        index = self._search_index
+        if index is None:
+            with self._write_lock:
+                index = self._search_index
+                if index is None:
+                    index = SearchIndex()
+                    for event in self._by_id.values():
+                        index.add(event)
+                    self._search_index = index
+        return index
 
-    def add_event(self, event):
-        self.events.append(event)
-        self._save_events()
+    def _index(self, event):
+        if self._search_index is not None:
+            self._search_index.add(event)
+        if event.recurrence != 'none':
+            self._recurring[event.id] = event
+            return
+        item = (event.start, event.id, event)
+        bisect.insort(self._starts, item)
+        bisect.insort(self._by_duration.setdefault(_duration_class(event), []), item)
+
+    def _unindex(self, event):
+        if self._search_index is not None:
+            self._search_index.remove(event.id)
+        self._occurrences.invalidate(event.id)
+        if self._recurring.pop(event.id, None) is not None:
+            return
+        duration_class = _duration_class(event)
+        group = self._by_duration.get(duration_class, [])
+        for starts in (self._starts, group):
+            i = bisect.bisect_left(starts, (event.start, event.id))
+            if i < len(starts) and starts[i][1] == event.id:
+                del starts[i]
+        if not group:
+            # The longest events' group goes away with them, so later scans stop reaching back for it
+            self._by_duration.pop(duration_class, None)
+
+    def _put(self, event):
+        existing = self._by_id.get(event.id)
+        if existing is not None:
+            self._unindex(existing)
+        self._by_id[event.id] = event
+        self._index(event)
+        self._published = None
+        self.version = next(_versions)
+
+    def _put_all(self, events):
+        # Startup version of _put: one sort instead of an insort per event
+        for event in events:
+            self._by_id[event.id] = event
+        for event in self._by_id.values():
+            if event.recurrence != 'none':
+                self._recurring[event.id] = event
+            else:
+                item = (event.start, event.id, event)
+                self._starts.append(item)
+                self._by_duration.setdefault(_duration_class(event), []).append(item)
+        # Ids are unique, so the sorts never have to compare the events themselves
+        self._starts.sort()
+        for starts in self._by_duration.values():
+            starts.sort()
+        self._published = None
+        self.version = next(_versions)
+
+    def close(self):
+        self.storage.close()
+
+    def add_listener(self, callback):
+        # callback(action, event) runs after each 'add', 'update' or 'delete'
+        self._listeners.append(callback)
+
+    def _notify(self, action, event):
+        # The change is already stored, so a failing listener mustn't turn it into an error
+        for callback in self._listeners:
+            try:
+                callback(action, event)
+            except Exception as e:
+                print(f"Listener failed on {action} of event {event.id}: {e}")
+
+    @EVENT_MANAGER_SECONDS.timed(operation='add_event')
+    def add_event(self, event, reject_conflicts=False):
+        with self._write_lock:
+            if reject_conflicts:
+                conflicts = self.find_conflicts_with(event, limit=10)
+                if conflicts:
+                    raise ConflictError(conflicts)
+            record = event.to_dict()
+            self._put(event)
+            self.storage.put(record)
+            self._notify('add', event)
         return event
 
+    @EVENT_MANAGER_SECONDS.timed(operation='add_events')
+    def add_events(self, events):
+        """
+        Adds a batch of already validated events with a single storage write.
+        An event whose id already exists replaces the stored one.
+        """
+        with self._write_lock:
+            # Serialize first so nothing that can fail runs after the indexes change
+            records = [event.to_dict() for event in events]
+            for event in events:
+                self._put(event)
+            self.storage.put_many(records)
+            for event in events:
+                self._notify('add', event)
+        return events
+
+    def iter_events(self):
+        # Stored events (recurring series unexpanded) in insertion order
+        return iter(self.events)
+
     def get_event(self, event_id):
-        for event in self.events:
-            if event.id == event_id:
-                return event
-        return None
+        return self._by_id.get(event_id)
 
+    @EVENT_MANAGER_SECONDS.timed(operation='get_all_events')
     def get_all_events(self, expand_recurring=True, after=None):
         # Return all events, optionally expanding recurring events to their next occurrence
+        return list(self.iter_all_events(expand_recurring, after))
+
+    def iter_all_events(self, expand_recurring=True, after=None):
+        """
+        Lazy form of get_all_events. Only the recurring series are expanded
+        and sorted up front; one-off events stream straight from the index.
+        """
         after = after or datetime.now()
-        result = []
-        for event in self.events:
-            if expand_recurring and event.recurrence != 'none':
-                next_occ = event.next_occurrence(after)
-                if next_occ:
-                    # Create a copy with updated times
-                    e_dict = event.to_dict().copy()
-                    e_dict['start_time'] = next_occ[0].isoformat()
-                    e_dict['end_time'] = next_occ[1].isoformat()
-                    result.append(Event.from_dict(e_dict))
+        snapshot = self._snapshot()
+        series = []
+        for event in self._series(snapshot):
+            if expand_recurring:
+                occurrence = self._occurrences.next_occurrence(event, after)
+                if occurrence:
+                    series.append((occurrence.start, event.id, occurrence.end, occurrence))
             else:
-                result.append(event)
-        # Sort by start time ascending
-        return sorted(result, key=lambda e: datetime.fromisoformat(e.start_time))
+                series.append((event.start, event.id, None, event))
+        series.sort(key=lambda item: item[:2])
+        # One-off events are already in start order; only the series need sorting
+        one_off = self._iter_one_off(snapshot, None, None, None)
+        for _, _, _, event in heapq.merge(one_off, series, key=lambda item: item[:2]):
+            yield event
+
+    @EVENT_MANAGER_SECONDS.timed(operation='search')
+    def search(self, query, limit=None, after=None):
+        """
+        Returns events whose title or description contain every word of the
+        query (as a word prefix), best match first. Recurring events are
+        expanded to their next occurrence, as in get_all_events.
+        """
+        return list(self.iter_search(query, limit, after))
+
+    def iter_search(self, query, limit=None, after=None):
+        # Lazy form of search; matching ids are ranked up front, events are produced as consumed
+        matches = (self._by_id.get(event_id) for event_id in self._searchable().search(query))
+        # An event deleted after the index was read comes back as None
+        return self._upcoming((event for event in matches if event is not None), limit, after)
+
+    def _upcoming(self, events, limit=None, after=None):
+        # Expand recurring events to their next occurrence, dropping finished series
+        after = after or datetime.now()
+        count = 0
+        for event in events:
+            if event.recurrence != 'none':
+                event = self._occurrences.next_occurrence(event, after)
+                if not event:
+                    continue
+            yield event
+            count += 1
+            if limit and count >= limit:
+                return
+
+    @EVENT_MANAGER_SECONDS.timed(operation='get_events_between')
+    def get_events_between(self, window_start, window_end):
+        """
+        Returns events overlapping [window_start, window_end) in start order.
+        Recurring series contribute each occurrence that falls in the window.
+        """
+        return list(self.iter_range(window_start, window_end))
+
+    def iter_range(self, window_start=None, window_end=None, after_key=None):
+        """
+        Lazily yields events overlapping [window_start, window_end) ordered by
+        (start, id). Either bound may be None. after_key, a (start, id) pair
+        from a previous page, resumes the listing just past that item.
+        Recurring series are expanded only inside the window, one occurrence
+        at a time, so a consumer that stops early pays only for what it read.
+        """
+        snapshot = self._snapshot()
+        streams = [self._iter_one_off(snapshot, window_start, window_end, after_key)]
+        series_start = window_start
+        if after_key and (series_start is None or after_key[0] > series_start):
+            series_start = after_key[0]
+        for event in self._series(snapshot, window_end):
+            streams.append(self._iter_series(event, series_start, window_end, after_key))
+        for _, _, _, event in heapq.merge(*streams, key=lambda item: item[:2]):
+            yield event
+
+    @EVENT_MANAGER_SECONDS.timed(operation='find_conflicts')
+    def find_conflicts(self, window_start, window_end, limit=None):
+        """
+        Returns (earlier, later) pairs of occurrences that overlap inside
+        [window_start, window_end). A sweep over the start-ordered range keeps
+        a heap of occurrences still running, so the cost is proportional to
+        the events in the window plus the conflicts found.
+        """
+        conflicts = []
+        active = []  # (end, seq, event) for occurrences that haven't ended yet
+        for seq, event in enumerate(self.iter_range(window_start, window_end)):
+            while active and active[0][0] <= event.start:
+                heapq.heappop(active)
+            for _, _, other in sorted(active, key=lambda item: item[1]):
+                conflicts.append((other, event))
+                if limit and len(conflicts) >= limit:
+                    return conflicts
+            heapq.heappush(active, (event.end, seq, event))
+        return conflicts
+
+    @EVENT_MANAGER_SECONDS.timed(operation='find_conflicts_with')
+    def find_conflicts_with(self, event, horizon=CONFLICT_HORIZON, limit=None):
+        """
+        Returns stored occurrences overlapping any occurrence of event (the
+        first `horizon` of it, for a recurring series). The event's own id is
+        ignored, so this also works for a proposed update.
+        """
+        window_end = event.start + horizon if event.recurrence != 'none' else event.end
+        candidates = list(event.occurrences(event.start, window_end))
+        conflicts = []
+        i = 0
+        for other in self.iter_range(event.start, window_end):
+            if other.id == event.id:
+                continue
+            # Candidates are start-ordered and equally long, so ends are ordered too
+            while i < len(candidates) and candidates[i][1] <= other.start:
+                i += 1
+            if i < len(candidates) and candidates[i][0] < other.end:
+                conflicts.append(other)
+                if limit and len(conflicts) >= limit:
+                    break
+        return conflicts
 
+    @EVENT_MANAGER_SECONDS.timed(operation='find_free_slots')
+    def find_free_slots(self, duration, window_start, window_end, limit=None):
+        """
+        Returns (start, end) gaps of at least `duration` between the
+        occurrences in [window_start, window_end), earliest first.
+        """
+        slots = []
+        free_from = window_start
+        for event in self.iter_range(window_start, window_end):
+            if event.start - free_from >= duration:
+                slots.append((free_from, event.start))
+                if limit and len(slots) >= limit:
+                    return slots
+            free_from = max(free_from, event.end)
+            if free_from >= window_end:
+                return slots
+        if window_end - free_from >= duration:
+            slots.append((free_from, window_end))
+        return slots
+
+    def _series(self, snapshot, window_end=None):
+        # Recurring series that may have occurrences before window_end
+        return snapshot.recurring
+
+    def _iter_one_off(self, snapshot, window_start, window_end, after_key):
+        # Yields (start, id, end, event) for one-off events overlapping the window
+        if window_start is None:
+            return self._scan(snapshot.starts, 0, window_start, window_end, after_key)
+        scans = []
+        for longest, starts in snapshot.by_duration:
+            # Nothing in this group starting earlier than this can still be running at window_start
+            i = bisect.bisect_left(starts, (earlier(window_start, longest),))
+            scans.append(self._scan(starts, i, window_start, window_end, after_key))
+        # Ids are unique, so merging never compares past (start, id)
+        return heapq.merge(*scans)
+
+    def _scan(self, starts, i, window_start, window_end, after_key):
+        if after_key:
+            i = max(i, bisect.bisect_right(starts, after_key, key=lambda item: item[:2]))
+        while i < len(starts):
+            start, event_id, event = starts[i]
+            if window_end is not None and start >= window_end:
+                return
+            if window_start is None or event.end > window_start:
+                yield (start, event_id, event.end, event)
+            i += 1
+
+    def _iter_series(self, event, window_start, window_end, after_key):
+        # Yields (start, id, end, occurrence) from the materialized occurrence cache
+        for occurrence in self._occurrences.occurrences(event, window_start, window_end):
+            if after_key and (occurrence.start, event.id) <= after_key:
+                continue
+            yield (occurrence.start, event.id, occurrence.end, occurrence)
+
+    @EVENT_MANAGER_SECONDS.timed(operation='update_event')
     def update_event(self, event_id, new_data):
-        event = self.get_event(event_id)
-        if event:
-            # Update only provided fields, keeping existing if not provided
-            event.title = new_data.get('title', event.title)
-            event.description = new_data.get('description', event.description)
-            event.recurrence = new_data.get('recurrence', event.recurrence)
-            event.email = new_data.get('email', event.email)
-
-            # Validate and update start_time and end_time if provided
-            updated_start_time = new_data.get('start_time')
-            updated_end_time = new_data.get('end_time')
-
-            if updated_start_time:
-                try:
-                    event.start_time = datetime.fromisoformat(updated_start_time).isoformat()
-                except ValueError:
-                    raise ValueError("New start time must be a valid ISO 8601 datetime string.")
-            if updated_end_time:
-                try:
-                    event.end_time = datetime.fromisoformat(updated_end_time).isoformat()
-                except ValueError:
-                    raise ValueError("New end time must be a valid ISO 8601 datetime string.")
-
-            # Re-validate start/end time relationship after updates
-            if datetime.fromisoformat(event.start_time) >= datetime.fromisoformat(event.end_time):
-                raise ValueError("Updated start time cannot be greater than or equal to updated end time.")
-
-            self._save_events()
-            return event
-        return None
+        with self._write_lock:
+            event = self.get_event(event_id)
+            if event:
+                updated = self._updated(event, new_data)
+                self._put(updated)
+                self.storage.put(updated.to_dict())
+                self._notify('update', updated)
+                return updated
+            return None
+
+    def _updated(self, event, new_data):
+        # Returns a validated copy of event with new_data applied; event itself is left alone
+        start = event.start
+        end = event.end
+        updated_start_time = new_data.get('start_time')
+        updated_end_time = new_data.get('end_time')
+
+        if updated_start_time:
+            try:
+                start = naive_local(datetime.fromisoformat(updated_start_time))
+            except (ValueError, OverflowError):
+                raise ValueError("New start time must be a valid ISO 8601 datetime string.")
+        if updated_end_time:
+            try:
+                end = naive_local(datetime.fromisoformat(updated_end_time))
+            except (ValueError, OverflowError):
+                raise ValueError("New end time must be a valid ISO 8601 datetime string.")
+
+        # Re-validate start/end time relationship after updates
+        if start >= end:
+            raise ValueError("Updated start time cannot be greater than or equal to updated end time.")
+
+        # Update only provided fields, keeping existing if not provided
+        updated = event.with_times(start, end)
+        updated.title = new_data.get('title', event.title)
+        updated.description = new_data.get('description', event.description)
+        updated.recurrence = new_data.get('recurrence', event.recurrence)
+        updated.email = new_data.get('email', event.email)
+        return updated
 
+    @EVENT_MANAGER_SECONDS.timed(operation='delete_event')
     def delete_event(self, event_id):
-        initial_len = len(self.events)
-        self.events = [event for event in self.events if event.id != event_id]
-        if len(self.events) < initial_len:
-            self._save_events()
-            return True # Event was found and deleted
-        return False # Event not found
\ No newline at end of file
+        with self._write_lock:
+            event = self._by_id.get(event_id)
+            if event:
+                del self._by_id[event_id]
+                self._unindex(event)
+                self._published = None
+                self.version = next(_versions)
+                self.storage.delete(event_id)
+                self._notify('delete', event)
+                return True # Event was found and deleted
+            return False # Event not found
@@ -0,0 +1,155 @@
+"""
+Minimal iCalendar (RFC 5545) reading and writing for bulk import/export.
+
+Only what maps onto Event is supported: UID, SUMMARY, DESCRIPTION,
+DTSTART/DTEND, an ATTENDEE mailto address as the notification email, and
+RRULEs of the form FREQ=DAILY|WEEKLY|MONTHLY. Times are written as floating
+local times with second precision.
+"""
+from datetime import datetime, timezone
+
+FREQUENCIES = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY'}
+RECURRENCES = {freq: recurrence for recurrence, freq in FREQUENCIES.items()}
+
+CALENDAR_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Event Scheduler System//EN\r\n"
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _unescape(text):
+    result = []
+    chars = iter(text)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '')
+            result.append('\n' if char in 'nN' else char)
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def _fold(line):
+    # Content lines are limited to 75 octets; continuations start with a space
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # Don't split a multi-byte UTF-8 sequence
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_time(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def _parse_time(value, params):
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d')
+    if value.endswith('Z'):
+        # Convert UTC to the naive local times the rest of the app uses
+        utc = datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+        return utc.astimezone().replace(tzinfo=None)
+    return datetime.strptime(value, '%Y%m%dT%H%M%S')
+
+
+def event_to_vevent(event, stamp=None):
+    stamp = stamp or datetime.now(timezone.utc)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event.id}",
+        f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART:{_format_time(event.start)}",
+        f"DTEND:{_format_time(event.end)}",
+        f"SUMMARY:{_escape(event.title)}",
+    ]
+    if event.description:
+        lines.append(f"DESCRIPTION:{_escape(event.description)}")
+    if event.recurrence in FREQUENCIES:
+        lines.append(f"RRULE:FREQ={FREQUENCIES[event.recurrence]}")
+    if event.email:
+        lines.append(f"ATTENDEE:mailto:{event.email}")
+    lines.append("END:VEVENT")
+    return ''.join(_fold(line) for line in lines)
+
+
+def iter_ics(events):
+    """
+    Yields an iCalendar document one VEVENT at a time.
+    """
+    stamp = datetime.now(timezone.utc)
+    yield CALENDAR_HEADER
+    for event in events:
+        yield event_to_vevent(event, stamp)
+    yield CALENDAR_FOOTER
+
+
+def _unfold(lines):
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _parse_line(line):
+    name_part, _, value = line.partition(':')
+    name, *param_parts = name_part.split(';')
+    params = {}
+    for part in param_parts:
+        key, _, param_value = part.partition('=')
+        params[key.upper()] = param_value
+    return name.upper(), params, value
+
+
+def parse_ics(lines):
+    """
+    Yields one event dict (the Event.to_dict layout) per VEVENT found in an
+    iterable of text lines. Raises ValueError for properties Event can't
+    represent, such as an RRULE other than a plain daily/weekly/monthly one.
+    """
+    data = None
+    for line in _unfold(lines):
+        name, params, value = _parse_line(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            data = {"recurrence": "none"}
+        elif data is None:
+            continue
+        elif name == 'END' and value.upper() == 'VEVENT':
+            yield data
+            data = None
+        elif name == 'UID':
+            data["id"] = value
+        elif name == 'SUMMARY':
+            data["title"] = _unescape(value)
+        elif name == 'DESCRIPTION':
+            data["description"] = _unescape(value)
+        elif name in ('DTSTART', 'DTEND'):
+            key = 'start_time' if name == 'DTSTART' else 'end_time'
+            try:
+                data[key] = _parse_time(value, params).isoformat()
+            except ValueError:
+                raise ValueError(f"Invalid {name} value: {value}")
+        elif name == 'RRULE':
+            rule = dict(part.partition('=')[::2] for part in value.upper().split(';') if part)
+            if set(rule) - {'FREQ', 'WKST'} or rule.get('FREQ') not in RECURRENCES:
+                raise ValueError(f"Unsupported RRULE: {value}")
+            data["recurrence"] = RECURRENCES[rule['FREQ']]
+        elif name == 'ATTENDEE' and 'email' not in data and value.lower().startswith('mailto:'):
+            data["email"] = value[len('mailto:'):]
@@ -0,0 +1,297 @@
+"""
+In-process metrics with Prometheus text exposition, plus an opt-in
+sampling profiler.
+
+Metrics are registered once at import time in the module-level REGISTRY and
+rendered by render(). Set EVENTS_METRICS=0 to turn recording off; every
+inc/observe/time call then returns after a single flag check.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}  # name -> metric, in registration order
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Re-registering a name returns the existing metric (e.g. on module reload)
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry if registry is not None else REGISTRY
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> value
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._functions = {}  # label values tuple -> callable read at scrape time
+
+    def set(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function, **labels):
+        # For values that already live elsewhere, such as a queue's length
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def value(self, **labels):
+        key = self._key(labels)
+        function = self._functions.get(key)
+        return function() if function else self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = dict(self._values)
+            functions = list(self._functions.items())
+        for key, function in functions:
+            items[key] = function()
+        for key, value in items.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter() if self.histogram.registry.enabled else None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.started is not None:
+            self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))  # values map to [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """
+        Context manager that observes the duration of its block.
+        """
+        return _Timer(self, labels)
+
+    def timed(self, **labels):
+        """
+        Decorator form of time().
+        """
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+REGISTRY = Registry(enabled=os.environ.get('EVENTS_METRICS', '1') != '0')
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render():
+    return REGISTRY.render()
+
+
+# --- Metrics shared across modules ---
+EVENT_MANAGER_SECONDS = histogram(
+    'event_manager_operation_seconds', "Time spent in EventManager operations.", ['operation'])
+OCCURRENCE_CACHE_TOTAL = counter(
+    'occurrence_cache_operations_total', "Occurrence cache builds, advances and direct-expansion fallbacks.",
+    ['result'])
+OCCURRENCES_MATERIALIZED = histogram(
+    'occurrence_cache_materialized_occurrences', "Occurrences expanded per occurrence cache build or advance.",
+    buckets=(1, 5, 15, 30, 60, 90, 180, 365))
+REMINDER_LAG_SECONDS = histogram(
+    'reminder_lag_seconds', "How late reminders fire relative to when they were due.",
+    buckets=(0.01, 0.1, 0.5, 1, 5, 30, 60, 300, 900))
+REMINDERS_TOTAL = counter('reminders_fired_total', "Reminders fired.")
+REMINDERS_PENDING = gauge('reminders_pending', "Events with a scheduled reminder.")
+EMAIL_SEND_SECONDS = histogram('email_send_seconds', "Time spent delivering one email, retries included.")
+EMAILS_TOTAL = counter('emails_total', "Email delivery attempts by result.", ['result'])
+EMAIL_QUEUE_DEPTH = gauge('email_queue_depth', "Emails waiting to be sent.")
+HTTP_REQUEST_SECONDS = histogram(
+    'http_request_duration_seconds', "Time spent handling HTTP requests.", ['method', 'endpoint'])
+HTTP_REQUESTS_TOTAL = counter(
+    'http_requests_total', "HTTP requests handled.", ['method', 'endpoint', 'status'])
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples every thread's stack at a fixed
+    interval from a background thread. Nothing is measured until start()
+    is called, and the application threads are never interrupted.
+    collapsed() returns the samples in the folded "frame;frame;frame count"
+    format understood by flamegraph tools.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = _Tally()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+
+    def sample(self):
+        own = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stacks.append(";".join(reversed(names)))
+        with self._lock:
+            self._stacks.update(stacks)
+
+    def collapsed(self):
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from email.mime.text import MIMEText
+from metrics import EMAIL_SEND_SECONDS, EMAILS_TOTAL
+
+
+def _quit(conn):
+    try:
+        conn.quit()
+    except Exception:
+        pass
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of authenticated SMTP connections.
+
+    connect() must return a ready-to-use connection (STARTTLS and login done).
+    Idle connections are reused; one that raises while in use is discarded,
+    so a connection the server dropped is replaced on the next attempt.
+    """
+
+    def __init__(self, connect, size=4):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except Exception:
+                _quit(conn)
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                _quit(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class EmailDispatcher:
+    """
+    Queue of outgoing emails drained by a pool of worker threads.
+
+    Each worker takes up to batch_size queued messages at a time and merges
+    the ones addressed to the same recipient into a single email. Failed
+    sends are retried with exponential backoff before being given up on.
+    """
+
+    def __init__(self, pool, sender, workers=4, batch_size=50, max_retries=3, backoff=1.0, sleep=time.sleep):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._sleep = sleep
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def send(self, to_email, subject, body):
+        EMAILS_TOTAL.inc(result='queued')
+        self._queue.put((to_email, subject, body))
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def join(self):
+        # Blocks until everything queued so far has been delivered or given up on
+        self._queue.join()
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.pool.close()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Leave the stop marker for this or another worker
+                    self._queue.task_done()
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            by_recipient = OrderedDict()
+            for to_email, subject, body in batch:
+                by_recipient.setdefault(to_email, []).append((subject, body))
+            for to_email, messages in by_recipient.items():
+                self._deliver(to_email, messages)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _build_message(self, to_email, messages):
+        if len(messages) == 1:
+            subject, body = messages[0]
+        else:
+            subject = f"{len(messages)} reminders"
+            body = "\n\n".join(f"{s}\n{b}" for s, b in messages)
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = to_email
+        return msg
+
+    @EMAIL_SEND_SECONDS.timed()
+    def _deliver(self, to_email, messages):
+        msg = self._build_message(to_email, messages).as_string()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.pool.connection() as conn:
+                    conn.sendmail(self.sender, [to_email], msg)
+                EMAILS_TOTAL.inc(result='sent')
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Failed to send email to {to_email}: {e}")
+                    EMAILS_TOTAL.inc(result='failed')
+                    return False
+                EMAILS_TOTAL.inc(result='retry')
+                self._sleep(self.backoff * 2 ** attempt)
@@ -0,0 +1,165 @@
+import bisect
+from collections import namedtuple
+from datetime import datetime, timedelta
+from metrics import OCCURRENCE_CACHE_TOTAL, OCCURRENCES_MATERIALIZED
+
+# How far past the current time occurrences may be materialized
+OCCURRENCE_HORIZON = timedelta(days=90)
+# How far the clock moves before expired occurrences are dropped
+ADVANCE_STEP = timedelta(days=1)
+_TICK = timedelta(microseconds=1)
+
+# Every occurrence of one series that ends after base and starts before until, in start order.
+# base is the clock time of the last build or advance; until grows as reads need more, never past
+# base + horizon. Once it gets there, beyond holds the first occurrence starting at or after until
+# (None if the series ends first); until then it is False. Entries are replaced, never changed.
+_Entry = namedtuple('_Entry', ['series', 'key', 'base', 'until', 'starts', 'occurrences', 'beyond'])
+
+
+def _key(event):
+    # Anything an occurrence copies from its series; a change means the entry is stale
+    return (event.start, event.end, event.recurrence, event.title, event.description, event.email)
+
+
+class OccurrenceCache:
+    """
+    Materialized occurrences of recurring series over a rolling horizon.
+
+    Each series gets a start-sorted list of ready-made occurrence Events
+    starting at the current time. The list is filled lazily, only as far as
+    reads have needed (one occurrence at a time for "next occurrence" reads),
+    and never past the horizon. Once the clock has moved on by `step`,
+    finished occurrences are dropped. Reads before the current time or past
+    the horizon compute occurrences directly and leave the cache as it is.
+    """
+
+    def __init__(self, horizon=OCCURRENCE_HORIZON, step=ADVANCE_STEP, clock=datetime.now):
+        self.horizon = horizon
+        self.step = step
+        self._clock = clock
+        self._entries = {}  # event_id -> _Entry
+
+    def invalidate(self, event_id):
+        self._entries.pop(event_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def next_occurrence(self, event, after):
+        """
+        Returns the first occurrence of a recurring event starting strictly
+        after `after`, as an Event, or None once the series has ended.
+        """
+        entry = self._entries.get(event.id)
+        # Fast path: stored events are immutable, so the same object needs no field comparison
+        if entry is not None and entry.series is event and entry.base <= after:
+            i = bisect.bisect_right(entry.starts, after)
+            if i < len(entry.starts):
+                return entry.occurrences[i]
+            beyond = entry.beyond
+            if beyond is None or (beyond is not False and after < beyond.start):
+                return beyond
+        entry = self._current(event)
+        if entry is not None and entry.base <= after < entry.base + self.horizon:
+            if bisect.bisect_right(entry.starts, after) == len(entry.starts) and entry.beyond is False:
+                entry = self._fill_next(entry, event, after)
+            i = bisect.bisect_right(entry.starts, after)
+            if i < len(entry.starts):
+                return entry.occurrences[i]
+            if entry.beyond is None or after < entry.beyond.start:
+                return entry.beyond
+        OCCURRENCE_CACHE_TOTAL.inc(result='fallback')
+        occ = event.next_occurrence(after)
+        return event.with_times(*occ) if occ else None
+
+    def occurrences(self, event, window_start, window_end):
+        """
+        Yields occurrence Events overlapping [window_start, window_end) in
+        start order. Either bound may be None.
+        """
+        entry = None
+        if window_start is not None and window_end is not None:
+            entry = self._entries.get(event.id)
+            if (entry is None or entry.series is not event or window_start < entry.base
+                    or window_end > entry.until):
+                entry = self._current(event)
+        if entry is None or window_start < entry.base or window_end > entry.base + self.horizon:
+            OCCURRENCE_CACHE_TOTAL.inc(result='fallback')
+            for start, end in event.occurrences(window_start, window_end):
+                yield event.with_times(start, end)
+            return
+        if window_end > entry.until:
+            entry = self._fill(entry, event, window_end)
+        starts = entry.starts
+        # Occurrences share one duration, so ending after window_start means starting after this
+        i = bisect.bisect_right(starts, window_start - (event.end - event.start))
+        while i < len(starts) and starts[i] < window_end:
+            yield entry.occurrences[i]
+            i += 1
+
+    def _current(self, event):
+        # The entry for event as of the current time, advanced if the clock has moved on; None on overflow
+        entry = self._entries.get(event.id)
+        now = self._clock()
+        try:
+            if entry is None or (entry.series is not event and entry.key != _key(event)):
+                entry = self._build(event, now)
+                OCCURRENCE_CACHE_TOTAL.inc(result='build')
+            elif now - entry.base >= self.step:
+                entry = self._advance(entry, event, now)
+                OCCURRENCE_CACHE_TOTAL.inc(result='advance')
+            elif entry.series is not event:
+                entry = entry._replace(series=event)
+            else:
+                return entry
+        except OverflowError:
+            return None
+        self._entries[event.id] = entry
+        return entry
+
+    def _build(self, event, now):
+        # Starts out holding only the first occurrence still running at now or starting later
+        occ = event.next_occurrence(now - (event.end - event.start))
+        limit = now + self.horizon
+        if occ is None or occ[0] >= limit:
+            return _Entry(event, _key(event), now, limit, [], [], event.with_times(*occ) if occ else None)
+        return _Entry(event, _key(event), now, occ[0] + _TICK, [occ[0]], [event.with_times(*occ)], False)
+
+    def _advance(self, entry, event, now):
+        # Drop occurrences that ended by now; the rest are kept as they are
+        duration = event.end - event.start
+        i = bisect.bisect_right(entry.starts, now - duration)
+        return entry._replace(series=event, base=now, until=max(entry.until, now - duration),
+                              starts=entry.starts[i:], occurrences=entry.occurrences[i:], beyond=False)
+
+    def _extend(self, entry, event, occ):
+        # Append occ, the first (start, end) starting at or after entry.until, or stop at the horizon
+        limit = entry.base + self.horizon
+        if occ is None or occ[0] >= limit:
+            return entry._replace(until=limit, beyond=event.with_times(*occ) if occ else None)
+        return entry._replace(until=occ[0] + _TICK, starts=entry.starts + [occ[0]],
+                              occurrences=entry.occurrences + [event.with_times(*occ)])
+
+    def _fill(self, entry, event, until):
+        # Materialize the occurrences starting in [entry.until, until) and publish the longer entry
+        starts, occurrences = [], []
+        for start, end in event.occurrences(entry.until, until):
+            if start >= entry.until:
+                starts.append(start)
+                occurrences.append(event.with_times(start, end))
+        OCCURRENCES_MATERIALIZED.observe(len(starts))
+        entry = entry._replace(until=until, starts=entry.starts + starts,
+                               occurrences=entry.occurrences + occurrences)
+        self._entries[event.id] = entry
+        return entry
+
+    def _fill_next(self, entry, event, after):
+        # Extend the entry just far enough to hold the first occurrence starting after `after`
+        if after >= entry.until:
+            entry = self._fill(entry, event, after + _TICK)
+        entry = self._extend(entry, event, event.next_occurrence(entry.until - _TICK))
+        self._entries[event.id] = entry
+        return entry
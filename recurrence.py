@@ -0,0 +1,94 @@
+import calendar
+from datetime import MAXYEAR, datetime, timedelta
+
+# Fixed-length steps; 'monthly' is handled with real calendar months
+STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+
+def add_months(dt, months):
+    # Clamp the day so Jan 31 + 1 month is the last day of February
+    month_index = dt.month - 1 + months
+    year = dt.year + month_index // 12
+    month = month_index % 12 + 1
+    if year > MAXYEAR:
+        raise OverflowError("date value out of range")
+    day = min(dt.day, calendar.monthrange(year, month)[1])
+    return dt.replace(year=year, month=month, day=day)
+
+
+def earlier(dt, delta):
+    # dt - delta, clamped to datetime.min instead of overflowing for windows starting in year 1
+    try:
+        return dt - delta
+    except OverflowError:
+        return datetime.min
+
+
+def is_recurring(recurrence):
+    return recurrence in STEPS or recurrence == 'monthly'
+
+
+def nth_start(start, recurrence, n):
+    """
+    Start of the n-th occurrence (0-based) of a series beginning at start.
+    Monthly occurrences are always computed from the original start, so a
+    series on the 31st returns to the 31st after a short month.
+    """
+    if recurrence == 'monthly':
+        return add_months(start, n)
+    return start + STEPS[recurrence] * n
+
+
+def first_index_after(start, recurrence, after):
+    # Smallest n such that the n-th occurrence starts strictly after 'after'
+    if after < start:
+        return 0
+    if recurrence == 'monthly':
+        n = (after.year - start.year) * 12 + after.month - start.month
+        while add_months(start, n) <= after:
+            n += 1
+        return n
+    return (after - start) // STEPS[recurrence] + 1
+
+
+def next_occurrence(start, end, recurrence, after):
+    """
+    Returns the first (start, end) occurrence starting strictly after 'after',
+    or None. Runs in constant time regardless of how old the series is.
+    """
+    if not is_recurring(recurrence):
+        return (start, end) if start > after else None
+    try:
+        occ_start = nth_start(start, recurrence, first_index_after(start, recurrence, after))
+    except OverflowError:
+        return None
+    return (occ_start, occ_start + (end - start))
+
+
+def occurrences(start, end, recurrence, window_start=None, window_end=None):
+    """
+    Yields (start, end) for every occurrence overlapping [window_start, window_end),
+    in start order. Either bound may be None for an open-ended window.
+    """
+    duration = end - start
+    if not is_recurring(recurrence):
+        if (window_end is None or start < window_end) and (window_start is None or end > window_start):
+            yield (start, end)
+        return
+    try:
+        n = 0 if window_start is None else first_index_after(start, recurrence, earlier(window_start, duration))
+    except OverflowError:
+        # The window starts after the last occurrence a datetime can hold
+        return
+    while True:
+        try:
+            occ_start = nth_start(start, recurrence, n)
+        except OverflowError:
+            return
+        if window_end is not None and occ_start >= window_end:
+            return
+        yield (occ_start, occ_start + duration)
+        n += 1
@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from metrics import REMINDER_LAG_SECONDS, REMINDERS_TOTAL
+
+# How long before an occurrence starts its reminder fires
+REMINDER_LEAD = timedelta(hours=1)
+# Upper bound on a single sleep, so a wall-clock change is noticed eventually
+MAX_SLEEP_SECONDS = 300
+
+
+class ReminderScheduler:
+    """
+    Fires one reminder per occurrence, `lead` before it starts.
+
+    Each event has at most one live entry in a min-heap ordered by when its
+    next reminder is due. The worker thread sleeps until the earliest entry
+    is due or until EventManager reports a change; superseded entries are
+    left in the heap and skipped when they surface.
+    """
+
+    def __init__(self, event_manager, on_reminder, lead=REMINDER_LEAD, clock=datetime.now):
+        self.event_manager = event_manager
+        self.on_reminder = on_reminder  # called as on_reminder(event, start, end)
+        self.lead = lead
+        self.clock = clock
+        self._heap = []       # (due, seq, event_id, start, end)
+        self._live = {}       # event_id -> seq of its current heap entry
+        self._reminded = {}   # event_id -> start of the last occurrence reminded
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        now = clock()
+        for event in event_manager.events:
+            self._schedule(event, now)
+        event_manager.add_listener(self._on_change)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    @property
+    def pending(self):
+        return len(self._live)
+
+    def run_pending(self, now=None):
+        """
+        Fires every reminder due at `now` and schedules each series' next one.
+        Returns the (event, start, end) tuples that were fired.
+        """
+        now = now or self.clock()
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, event_id, start, end = heapq.heappop(self._heap)
+                if self._live.get(event_id) != seq:
+                    continue  # superseded by an update or delete
+                del self._live[event_id]
+                event = self.event_manager.get_event(event_id)
+                if event is None:
+                    continue
+                if start > now:
+                    due.append((event, start, end))
+                    self._reminded[event_id] = start
+                # Either reminded or already started; move on to the next occurrence
+                self._schedule(event, start)
+        for event, start, end in due:
+            REMINDER_LAG_SECONDS.observe(max(0.0, (now - (start - self.lead)).total_seconds()))
+            REMINDERS_TOTAL.inc()
+            try:
+                self.on_reminder(event, start, end)
+            except Exception as e:
+                # One bad event mustn't stop the others' reminders
+                print(f"Reminder for event {event.id} failed: {e}")
+        return due
+
+    def _schedule(self, event, after):
+        occ = event.next_occurrence(after)
+        if occ and occ[0] == self._reminded.get(event.id):
+            occ = event.next_occurrence(occ[0])
+        if not occ:
+            self._live.pop(event.id, None)
+            return
+        seq = next(self._seq)
+        self._live[event.id] = seq
+        heapq.heappush(self._heap, (occ[0] - self.lead, seq, event.id, occ[0], occ[1]))
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._compact()
+
+    def _compact(self):
+        # Drop superseded entries so the heap stays proportional to live events
+        self._heap = [entry for entry in self._heap if self._live.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
+
+    def _on_change(self, action, event):
+        with self._cond:
+            if action == 'delete':
+                self._live.pop(event.id, None)
+                self._reminded.pop(event.id, None)
+            else:
+                self._schedule(event, self.clock())
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_pending()
+            except Exception as e:
+                # Keep the thread alive; the entry that failed has already been taken off the heap
+                print(f"Reminder scheduling failed: {e}")
+            with self._cond:
+                if self._stopped:
+                    return
+                timeout = MAX_SLEEP_SECONDS
+                if self._heap:
+                    timeout = min(timeout, max(0, (self._heap[0][0] - self.clock()).total_seconds()))
+                self._cond.wait(timeout)
+                if self._stopped:
+                    return
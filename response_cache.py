@@ -0,0 +1,53 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# body is the serialized JSON; expires is a datetime after which the body is stale, or None
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'expires'])
+
+
+def make_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses.
+
+    Keys include the event store version, so a write makes every older
+    entry unreachable; those entries simply age out of the LRU order.
+    Entries built from "next occurrence" expansions carry an expiry, since
+    they change as time passes even without a write.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires is not None and now >= entry.expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, expires=None):
+        entry = CachedResponse(body, make_etag(body), expires)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
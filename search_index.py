@@ -0,0 +1,88 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r'\w+')
+
+# A match in the title counts for more than one in the description
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """
+    Inverted index over event titles and descriptions.
+
+    Every query term is matched as a prefix of an indexed token, and an
+    event must match all terms. Results are ranked by a weighted count of
+    matching tokens, with exact matches scoring above prefix matches.
+    All methods are safe to call from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(dict)  # token -> {event_id: weight}
+        self._vocabulary = []               # sorted tokens, for prefix scans
+        self._tokens = {}                   # event_id -> tokens it was indexed under
+
+    def add(self, event):
+        weights = defaultdict(int)
+        for token in tokenize(event.title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(event.description):
+            weights[token] += DESCRIPTION_WEIGHT
+        with self._lock:
+            for token, weight in weights.items():
+                postings = self._postings[token]
+                if not postings:
+                    bisect.insort(self._vocabulary, token)
+                postings[event.id] = weight
+            self._tokens[event.id] = list(weights)
+
+    def remove(self, event_id):
+        with self._lock:
+            for token in self._tokens.pop(event_id, ()):
+                postings = self._postings[token]
+                postings.pop(event_id, None)
+                if not postings:
+                    del self._postings[token]
+                    i = bisect.bisect_left(self._vocabulary, token)
+                    del self._vocabulary[i]
+
+    def search(self, query, limit=None):
+        """
+        Returns matching event ids, best match first.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores = None
+        with self._lock:
+            for term in terms:
+                term_scores = self._match(term)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {event_id: score + term_scores[event_id]
+                              for event_id, score in scores.items() if event_id in term_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores, key=lambda event_id: -scores[event_id])
+        return ranked[:limit] if limit else ranked
+
+    def _match(self, term):
+        scores = defaultdict(int)
+        i = bisect.bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            token = self._vocabulary[i]
+            # Exact token matches rank above prefix-only matches
+            boost = 2 if token == term else 1
+            for event_id, weight in self._postings[token].items():
+                scores[event_id] += weight * boost
+            i += 1
+        return scores
@@ -0,0 +1,244 @@
+import os
+import sqlite3
+import sys
+import threading
+from datetime import timedelta
+from event import Event
+from event_manager import ConflictError, EventManager
+from metrics import EVENT_MANAGER_SECONDS
+from occurrence_cache import OccurrenceCache
+from recurrence import earlier
+from search_index import tokenize
+from storage import JournalStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    recurrence TEXT,
+    email TEXT
+);
+CREATE INDEX IF NOT EXISTS events_start_time ON events (start_time, id);
+CREATE INDEX IF NOT EXISTS events_recurrence ON events (recurrence, start_time);
+CREATE TABLE IF NOT EXISTS event_stats (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+INSERT OR IGNORE INTO event_stats (name, value) VALUES ('max_duration_seconds', 0);
+INSERT OR IGNORE INTO event_stats (name, value) VALUES ('version', 0);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    title, description, content='events', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_au AFTER UPDATE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO events_fts (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_version_ai AFTER INSERT ON events BEGIN
+    UPDATE event_stats SET value = value + 1 WHERE name = 'version';
+END;
+CREATE TRIGGER IF NOT EXISTS events_version_ad AFTER DELETE ON events BEGIN
+    UPDATE event_stats SET value = value + 1 WHERE name = 'version';
+END;
+CREATE TRIGGER IF NOT EXISTS events_version_au AFTER UPDATE ON events BEGIN
+    UPDATE event_stats SET value = value + 1 WHERE name = 'version';
+END;
+"""
+
+COLUMNS = "id, title, description, start_time, end_time, recurrence, email"
+INSERT_SQL = ("INSERT INTO events (id, title, description, start_time, end_time, recurrence, email) "
+              "VALUES (:id, :title, :description, :start_time, :end_time, :recurrence, :email)")
+
+
+class SQLiteEventManager(EventManager):
+    """
+    EventManager backed by a SQLite database instead of an in-memory list.
+
+    Nothing is loaded up front: lookups, time-range listings and searches are
+    answered from indexed queries, and the database runs in WAL mode so
+    several processes can share one file. Only recurring series are expanded
+    in Python. Listeners only hear about changes made through this instance.
+    """
+
+    def __init__(self, db_path='events.db'):
+        self.storage_file = db_path
+        self.storage = None
+        self._listeners = []
+        # Entries are checked against the series fields, so other processes' edits are noticed
+        self._occurrences = OccurrenceCache()
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections can't be shared across threads; keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.storage_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _event(self, row):
+        return Event.from_dict(dict(row))
+
+    def _query(self, sql, params=()):
+        return (self._event(row) for row in self._conn().execute(sql, params))
+
+    def _write(self, sql, event):
+        data = event.to_dict()
+        duration = event.end - event.start
+        with self._conn() as conn:
+            conn.execute(sql, data)
+            conn.execute("UPDATE event_stats SET value = MAX(value, ?) WHERE name = 'max_duration_seconds'",
+                         (duration.total_seconds(),))
+
+    @property
+    def events(self):
+        return list(self.iter_events())
+
+    @property
+    def version(self):
+        # Bumped by triggers, so writes from other processes count too
+        value = self._conn().execute("SELECT value FROM event_stats WHERE name = 'version'").fetchone()[0]
+        return (self.storage_file, int(value))
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _save_events(self):
+        # Every change is already committed
+        pass
+
+    @EVENT_MANAGER_SECONDS.timed(operation='add_event')
+    def add_event(self, event, reject_conflicts=False):
+        # The check and the insert are separate transactions, so this is best effort across processes
+        if reject_conflicts:
+            conflicts = self.find_conflicts_with(event, limit=10)
+            if conflicts:
+                raise ConflictError(conflicts)
+        self._write(INSERT_SQL, event)
+        self._notify('add', event)
+        return event
+
+    @EVENT_MANAGER_SECONDS.timed(operation='add_events')
+    def add_events(self, events):
+        # The last event with a given id wins, as with the in-memory manager
+        rows = list({event.id: event.to_dict() for event in events}.values())
+        with self._conn() as conn:
+            # DELETE + INSERT rather than REPLACE, so the FTS triggers see both halves
+            conn.executemany("DELETE FROM events WHERE id = ?", [(row['id'],) for row in rows])
+            conn.executemany(INSERT_SQL, rows)
+            max_duration = max((e.end - e.start for e in events), default=timedelta(0))
+            conn.execute("UPDATE event_stats SET value = MAX(value, ?) WHERE name = 'max_duration_seconds'",
+                         (max_duration.total_seconds(),))
+        for event in events:
+            self._notify('add', event)
+        return events
+
+    def iter_events(self):
+        return self._query(f"SELECT {COLUMNS} FROM events ORDER BY rowid")
+
+    def get_event(self, event_id):
+        return next(self._query(f"SELECT {COLUMNS} FROM events WHERE id = ?", (event_id,)), None)
+
+    @EVENT_MANAGER_SECONDS.timed(operation='update_event')
+    def update_event(self, event_id, new_data):
+        event = self.get_event(event_id)
+        if event:
+            updated = self._updated(event, new_data)
+            self._write("UPDATE events SET title = :title, description = :description, start_time = :start_time, "
+                        "end_time = :end_time, recurrence = :recurrence, email = :email WHERE id = :id", updated)
+            self._occurrences.invalidate(event_id)
+            self._notify('update', updated)
+            return updated
+        return None
+
+    @EVENT_MANAGER_SECONDS.timed(operation='delete_event')
+    def delete_event(self, event_id):
+        event = self.get_event(event_id)
+        if event:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+            self._occurrences.invalidate(event_id)
+            self._notify('delete', event)
+            return True
+        return False
+
+    def iter_search(self, query, limit=None, after=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Every term must match a word prefix; title hits weigh twice as much
+        match = " ".join(f'"{term}"*' for term in terms)
+        matches = self._query(
+            "SELECT events.id, events.title, events.description, events.start_time, events.end_time, "
+            "events.recurrence, events.email FROM events_fts JOIN events ON events.rowid = events_fts.rowid "
+            "WHERE events_fts MATCH ? ORDER BY bm25(events_fts, 2.0, 1.0)", (match,))
+        return self._upcoming(matches, limit, after)
+
+    def _snapshot(self):
+        # Each query runs against SQLite's own consistent read snapshot
+        return None
+
+    def _series(self, snapshot, window_end=None):
+        sql = f"SELECT {COLUMNS} FROM events WHERE recurrence IS NOT 'none'"
+        if window_end is None:
+            return list(self._query(sql))
+        return list(self._query(sql + " AND start_time < ?", (window_end.isoformat(),)))
+
+    def _iter_one_off(self, snapshot, window_start, window_end, after_key):
+        sql = f"SELECT {COLUMNS} FROM events WHERE recurrence = 'none'"
+        params = []
+        if window_start is not None:
+            # Bound the index scan by the longest event ever stored
+            max_duration = self._conn().execute(
+                "SELECT value FROM event_stats WHERE name = 'max_duration_seconds'").fetchone()[0]
+            sql += " AND start_time >= ? AND end_time > ?"
+            params += [earlier(window_start, timedelta(seconds=max_duration)).isoformat(), window_start.isoformat()]
+        if window_end is not None:
+            sql += " AND start_time < ?"
+            params.append(window_end.isoformat())
+        if after_key:
+            sql += " AND (start_time, id) > (?, ?)"
+            params += [after_key[0].isoformat(), after_key[1]]
+        for event in self._query(sql + " ORDER BY start_time, id", params):
+            yield (event.start, event.id, event.end, event)
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """
+    One-shot import of an events.json snapshot (and its journal, if any)
+    into a SQLite database. Existing rows with the same id are replaced.
+    Returns the number of events imported.
+    """
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(json_path)
+    events = [Event.from_dict(item) for item in JournalStorage(json_path).load()]
+    manager = SQLiteEventManager(db_path)
+    manager.add_events(events)
+    manager.close()
+    return len(events)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python sqlite_event_manager.py <events.json> <events.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Imported {count} events into {sys.argv[2]}")
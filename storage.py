@@ -0,0 +1,313 @@
+import json
+import marshal
+import os
+import re
+import threading
+
+SNAPSHOT_CHUNK_SIZE = 1 << 20
+# Whitespace and the commas between array items
+_SEPARATORS = re.compile(r'[\s,]*')
+
+BINARY_SUFFIX = '.bin'
+BINARY_MAGIC = b'EVSNAP1\n'
+
+
+def _iter_snapshot(path):
+    """
+    Yields the records of a snapshot file one at a time, reading it in
+    chunks, so the document is never held in memory as a single string.
+    Raises json.JSONDecodeError if the file isn't a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(SNAPSHOT_CHUNK_SIZE)
+        pos = _SEPARATORS.match(buffer).end()
+        if buffer[pos:pos + 1] != '[':
+            raise json.JSONDecodeError("Expecting '['", buffer, pos)
+        pos += 1
+        eof = False
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError("Unterminated array", buffer, pos)
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The next record straddles the chunk boundary; read more and retry
+                chunk = f.read(SNAPSHOT_CHUNK_SIZE)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield record
+
+
+def _read_snapshot(path):
+    try:
+        return list(_iter_snapshot(path))
+    except FileNotFoundError:
+        return []
+    except json.JSONDecodeError:
+        # Handle empty or corrupted JSON files
+        return []
+
+
+def _snapshot_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _write_binary_snapshot(path, records):
+    # A marshal copy of the JSON snapshot at path, stamped with that file's size and mtime
+    data = marshal.dumps((_snapshot_stamp(path), list(records)))
+    tmp_path = path + BINARY_SUFFIX + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BINARY_MAGIC)
+        f.write(data)
+    os.replace(tmp_path, path + BINARY_SUFFIX)
+
+
+def _read_binary_snapshot(path):
+    """
+    Returns the records of the binary copy of the snapshot at path, or None
+    if there is none or the JSON file has changed since it was written.
+    """
+    try:
+        with open(path + BINARY_SUFFIX, 'rb') as f:
+            if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                return None
+            # Every record is needed at startup, so the whole cache is decoded in one call
+            stamp, records = marshal.load(f)
+        if stamp != _snapshot_stamp(path):
+            return None
+    except (OSError, ValueError, EOFError, TypeError):
+        # Missing, empty or unreadable sidecar: fall back to the JSON snapshot
+        return None
+    return records
+
+
+def _write_snapshot(path, records):
+    # Write to a temp file and rename it over the old snapshot, so a crash
+    # mid-write leaves either the old or the new file, never a torn one.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(records, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _replay(records, path):
+    # Apply journal records from path on top of records (id -> dict)
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn trailing record from a crash mid-append
+                    continue
+                if entry.get('op') == 'put':
+                    event = entry['event']
+                    records[event['id']] = event
+                elif entry.get('op') == 'delete':
+                    records.pop(entry['id'], None)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _truncate_torn_tail(path):
+    # Cut a partial last line left by a crash mid-append, so the next record starts on a line of its own
+    try:
+        with open(path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(pos, 4096)
+                f.seek(pos - step)
+                newline = f.read(step).rfind(b'\n')
+                if newline != -1:
+                    pos = pos - step + newline + 1
+                    break
+                pos -= step
+            if pos != end:
+                f.truncate(pos)
+                os.fsync(f.fileno())
+    except FileNotFoundError:
+        pass
+
+
+class JsonFileStorage:
+    """
+    Rewrites the whole snapshot file on every mutation.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._source = list
+
+    def attach(self, source):
+        # source() returns the current list of event dicts
+        self._source = source
+
+    def load(self):
+        return _read_snapshot(self.path)
+
+    def put(self, record):
+        self.save_all(self._source())
+
+    def put_many(self, records):
+        self.save_all(self._source())
+
+    def delete(self, event_id):
+        self.save_all(self._source())
+
+    def save_all(self, records):
+        _write_snapshot(self.path, records)
+
+    def close(self):
+        pass
+
+
+class JournalStorage:
+    """
+    Snapshot file plus an append-only journal of mutations.
+
+    Every put/delete is a single fsync'd JSON line in '<path>.journal'. Once
+    compact_threshold records have accumulated (or every compact_interval
+    seconds, if set) the journal is folded into the snapshot in a background
+    thread. The snapshot keeps the same format as the plain JSON file.
+
+    With binary_snapshot=True a marshal cache of the snapshot is kept next
+    to it in '<path>.bin' and read instead of the JSON at startup, for as
+    long as the JSON file is unchanged.
+    """
+
+    def __init__(self, path, compact_threshold=1000, compact_interval=None, fsync=True, binary_snapshot=False):
+        self.path = path
+        self.binary_snapshot = binary_snapshot
+        self.journal_path = path + '.journal'
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+        self._source = list
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._journal = None
+        self._pending = 0
+        self._compacting = False
+        self._stop = threading.Event()
+        self._timer = None
+
+    def attach(self, source):
+        # source() returns the current list of event dicts
+        self._source = source
+        if self.compact_interval and self._timer is None:
+            self._timer = threading.Thread(target=self._compact_periodically, daemon=True)
+            self._timer.start()
+
+    def load(self):
+        snapshot = _read_binary_snapshot(self.path) if self.binary_snapshot else None
+        from_binary = snapshot is not None
+        if not from_binary:
+            snapshot = _read_snapshot(self.path)
+        records = {item['id']: item for item in snapshot}
+        old_path = self.journal_path + '.old'
+        interrupted = _replay(records, old_path)
+        _replay(records, self.journal_path)
+        if interrupted:
+            # A compaction was cut short; finish it before accepting writes
+            self._write_snapshot(list(records.values()))
+            os.remove(old_path)
+            open(self.journal_path, 'w').close()
+        else:
+            _truncate_torn_tail(self.journal_path)
+            self._pending = self._count_journal()
+            if not os.path.exists(self.path):
+                self._write_snapshot([])
+            elif self.binary_snapshot and not from_binary:
+                # Make the next start fast
+                _write_binary_snapshot(self.path, snapshot)
+        return list(records.values())
+
+    def put(self, record):
+        self._append([{"op": "put", "event": record}])
+
+    def put_many(self, records):
+        # One write and one fsync for the whole batch
+        self._append([{"op": "put", "event": record} for record in records])
+
+    def delete(self, event_id):
+        self._append([{"op": "delete", "id": event_id}])
+
+    def save_all(self, records):
+        self.compact(records)
+
+    def compact(self, records=None):
+        with self._compact_lock:
+            with self._lock:
+                # New appends go to a fresh journal while the snapshot is written
+                self._close_journal()
+                if os.path.exists(self.journal_path):
+                    os.replace(self.journal_path, self.journal_path + '.old')
+                self._pending = 0
+            # Built outside the lock so appends don't wait on it. Anything it picks up that is
+            # also in the new journal is replayed over the snapshot to the same result.
+            if records is None:
+                records = self._source()
+            self._write_snapshot(records)
+            try:
+                os.remove(self.journal_path + '.old')
+            except FileNotFoundError:
+                pass
+            self._compacting = False
+
+    def close(self):
+        self._stop.set()
+        if self._pending:
+            self.compact()
+        with self._lock:
+            self._close_journal()
+
+    def _append(self, entries):
+        lines = ''.join(json.dumps(entry) + '\n' for entry in entries)
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a')
+            self._journal.write(lines)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._pending += len(entries)
+            start_compaction = self._pending >= self.compact_threshold and not self._compacting
+            if start_compaction:
+                self._compacting = True
+        if start_compaction:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def _write_snapshot(self, records):
+        _write_snapshot(self.path, records)
+        if self.binary_snapshot:
+            _write_binary_snapshot(self.path, records)
+
+    def _compact_periodically(self):
+        while not self._stop.wait(self.compact_interval):
+            if self._pending:
+                self.compact()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _count_journal(self):
+        try:
+            with open(self.journal_path, 'r') as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,313 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+import app as app_module
+from event import Event
+from calendar_registry import ManagerRegistry, file_calendar_factory
+from event_manager import EventManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return EventManager(str(tmp_path / 'events.json'))
+
+
+@pytest.fixture
+def client(manager):
+    return app_module.create_app(manager, start_background=False).test_client()
+
+
+def test_get_events_without_range_returns_list(client, manager):
+    manager.add_event(Event("Plain", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00"))
+    response = client.get('/events')
+    assert response.status_code == 200
+    assert [e["title"] for e in response.get_json()] == ["Plain"]
+
+
+def test_get_events_in_range_expands_series(client, manager):
+    manager.add_event(Event("Weekly", "", "2030-01-07T09:00:00", "2030-01-07T10:00:00", recurrence='weekly'))
+    manager.add_event(Event("Once", "", "2030-01-15T12:00:00", "2030-01-15T13:00:00"))
+    manager.add_event(Event("Later", "", "2030-03-01T12:00:00", "2030-03-01T13:00:00"))
+
+    response = client.get('/events?from=2030-01-01T00:00:00&to=2030-02-01T00:00:00')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [(e["title"], e["start_time"][:10]) for e in body["events"]] == [
+        ("Weekly", "2030-01-07"), ("Weekly", "2030-01-14"), ("Once", "2030-01-15"),
+        ("Weekly", "2030-01-21"), ("Weekly", "2030-01-28")]
+    assert body["next_cursor"] is None
+
+
+def test_get_events_in_range_paginates_with_cursor(client, manager):
+    manager.add_event(Event("Daily", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00", recurrence='daily'))
+    seen = []
+    url = '/events?from=2030-01-01T00:00:00&to=2030-01-06T00:00:00&limit=2'
+    while url:
+        body = client.get(url).get_json()
+        seen.extend(e["start_time"][:10] for e in body["events"])
+        url = body["next_cursor"] and ('/events?from=2030-01-01T00:00:00&to=2030-01-06T00:00:00&limit=2&cursor='
+                                       + body["next_cursor"])
+    assert seen == ["2030-01-01", "2030-01-02", "2030-01-03", "2030-01-04", "2030-01-05"]
+
+
+def test_get_events_in_range_rejects_bad_params(client):
+    assert client.get('/events?from=yesterday').status_code == 400
+    assert client.get('/events?limit=0').status_code == 400
+    assert client.get('/events?cursor=not-a-cursor').status_code == 400
+    assert client.get('/events?from=2030-02-01T00:00:00&to=2030-01-01T00:00:00').status_code == 400
+
+
+def test_range_accepts_extreme_and_offset_times(client, manager):
+    manager.add_event(Event("Long", "", "2030-01-01T09:00:00", "2031-01-01T09:00:00"))
+    body = client.get('/events?from=0001-01-01T00:00:00&to=2030-02-01T00:00:00').get_json()
+    assert [e["title"] for e in body["events"]] == ["Long"]
+    # Offsets are converted to local time, which the stored times are in
+    start = datetime(2030, 1, 1, 9).astimezone()
+    response = client.get('/events', query_string={"from": (start + timedelta(hours=1)).isoformat(),
+                                                   "to": (start + timedelta(hours=2)).isoformat()})
+    assert [e["title"] for e in response.get_json()["events"]] == ["Long"]
+    assert client.get('/events?from=0001-01-01T00:00:00%2B05:00').status_code == 400
+    # A series whose next occurrence would be past year 9999 just has none there
+    manager.add_event(Event("Monthly", "", "2030-01-31T18:00:00", "2030-01-31T19:00:00", recurrence='monthly'))
+    for query in ('to=9999-12-31T23:00:00', 'limit=5'):
+        response = client.get(f'/events?from=9999-12-31T20:00:00&{query}')
+        assert response.status_code == 200
+
+
+def test_offset_times_are_stored_as_local_time(client):
+    start = datetime(2030, 1, 1, 9).astimezone()
+    response = client.post('/events', json={"title": "Offset", "start_time": start.isoformat(),
+                                            "end_time": (start + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 201
+    assert response.get_json()["start_time"] == "2030-01-01T09:00:00"
+    assert [e["title"] for e in client.get('/events').get_json()] == ["Offset"]
+
+
+def test_search_events_uses_prefix_index(client, manager):
+    manager.add_event(Event("Design review", "UI mockups", "2030-01-01T09:00:00", "2030-01-01T10:00:00"))
+    manager.add_event(Event("Lunch", "", "2030-01-01T12:00:00", "2030-01-01T13:00:00"))
+    response = client.get('/events/search?query=mock')
+    assert [e["title"] for e in response.get_json()] == ["Design review"]
+    assert client.get('/events/search').status_code == 400
+
+
+def test_search_returns_every_match_unless_limited(client, manager):
+    manager.add_events([Event(f"Standup {i}", "", "2030-01-01T09:00:00", "2030-01-01T09:15:00") for i in range(150)])
+    assert len(client.get('/events/search?query=standup').get_json()) == 150
+    assert len(client.get('/events/search?query=standup&limit=20').get_json()) == 20
+
+
+def test_bulk_import_ndjson_commits_once(client, manager):
+    writes = []
+    put_many = manager.storage.put_many
+    manager.storage.put_many = lambda records: (writes.append(len(records)), put_many(records))
+    body = "\n".join([
+        '{"title": "One", "start_time": "2030-01-01T09:00:00", "end_time": "2030-01-01T10:00:00"}',
+        '',
+        '{"id": "fixed", "title": "Two", "start_time": "2030-01-02T09:00:00", "end_time": "2030-01-02T10:00:00"}',
+    ])
+    response = client.post('/events/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.get_json() == {"imported": 2}
+    assert writes == [2]
+    assert manager.get_event("fixed").title == "Two"
+
+
+def test_bulk_import_rejects_whole_batch_on_invalid_record(client, manager):
+    body = "\n".join([
+        '{"title": "Good", "start_time": "2030-01-01T09:00:00", "end_time": "2030-01-01T10:00:00"}',
+        '{"title": "Bad", "start_time": "2030-01-01T11:00:00", "end_time": "2030-01-01T10:00:00"}',
+    ])
+    response = client.post('/events/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"record": 2, "error": "Start time must be before end time."}]
+    assert manager.events == []
+    assert client.post('/events/bulk', data='[]', content_type='application/json').status_code == 415
+
+
+def test_bulk_import_rejects_non_string_ids(client, manager):
+    body = "\n".join([
+        '{"id": "a", "title": "One", "start_time": "2030-01-01T09:00:00", "end_time": "2030-01-01T10:00:00"}',
+        '{"id": 1, "title": "Two", "start_time": "2030-01-01T09:00:00", "end_time": "2030-01-01T10:00:00"}',
+    ])
+    response = client.post('/events/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"record": 2, "error": "Event id must be a string."}]
+    assert manager.events == []
+    assert manager.get_all_events(expand_recurring=False) == []
+
+
+def test_export_ndjson_and_reimport_ics(client, manager, tmp_path):
+    manager.add_event(Event("Weekly sync", "", "2030-01-07T09:00:00", "2030-01-07T10:00:00", recurrence='weekly'))
+    manager.add_event(Event("Once", "Notes", "2030-01-15T12:00:00", "2030-01-15T13:00:00", email="a@example.com"))
+
+    response = client.get('/events/export')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [event.to_dict() for event in manager.events]
+
+    ics = client.get('/events/export?format=ics')
+    assert ics.mimetype == 'text/calendar'
+    target = EventManager(str(tmp_path / 'copy.json'))
+    target_client = app_module.create_app(target, start_background=False).test_client()
+    response = target_client.post('/events/bulk', data=ics.get_data(), content_type='text/calendar')
+    assert response.get_json() == {"imported": 2}
+    assert [e.to_dict() for e in target.events] == [e.to_dict() for e in manager.events]
+
+
+def test_conflicts_and_free_slots_routes(client, manager):
+    manager.add_event(Event("Daily", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00", event_id="daily", recurrence='daily'))
+    manager.add_event(Event("Clash", "", "2030-01-02T09:30:00", "2030-01-02T11:00:00", event_id="clash"))
+
+    body = client.get('/events/conflicts?from=2030-01-01T00:00:00&to=2030-01-03T00:00:00').get_json()
+    assert [[e["id"] for e in pair] for pair in body] == [["daily", "clash"]]
+
+    response = client.get('/events/free-slots?duration=60&from=2030-01-02T08:00:00&to=2030-01-02T13:00:00')
+    assert response.get_json() == [{"start_time": "2030-01-02T08:00:00", "end_time": "2030-01-02T09:00:00"},
+                                   {"start_time": "2030-01-02T11:00:00", "end_time": "2030-01-02T13:00:00"}]
+    assert client.get('/events/free-slots?duration=0&from=2030-01-02T08:00:00&to=2030-01-02T13:00:00').status_code == 400
+    too_long = client.get('/events/free-slots?duration=99999999999999&from=2030-01-02T08:00:00&to=2030-01-02T13:00:00')
+    assert too_long.status_code == 400
+    assert client.get('/events/conflicts?from=2030-01-02T08:00:00').status_code == 400
+
+
+def test_create_event_can_reject_conflicts(client, manager):
+    manager.add_event(Event("Busy", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00", event_id="busy"))
+    overlapping = {"title": "New", "start_time": "2030-01-01T09:30:00", "end_time": "2030-01-01T10:30:00"}
+
+    response = client.post('/events?reject_conflicts=true', json=overlapping)
+    assert response.status_code == 409
+    assert [e["id"] for e in response.get_json()["conflicts"]] == ["busy"]
+    assert client.post('/events', json=overlapping).status_code == 201
+
+
+def test_event_listing_is_cached_with_etags(client, manager, monkeypatch):
+    event = manager.add_event(Event("Cached", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00"))
+    first = client.get('/events')
+    etag = first.headers['ETag']
+    calls = []
+    original = manager.get_all_events
+    monkeypatch.setattr(manager, 'get_all_events', lambda: calls.append(1) or original())
+
+    again = client.get('/events')
+    assert again.data == first.data and calls == []
+    assert client.get('/events', headers={'If-None-Match': etag}).status_code == 304
+
+    manager.update_event(event.id, {"title": "Changed"})
+    changed = client.get('/events', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and calls == [1]
+    assert changed.get_json()[0]["title"] == "Changed"
+    assert changed.headers['ETag'] != etag
+
+
+def test_event_by_id_and_search_support_conditional_get(client, manager):
+    event = manager.add_event(Event("Budget review", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00"))
+    for url in (f'/events/{event.id}', '/events/search?query=budget'):
+        etag = client.get(url).headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/events/missing').status_code == 404
+
+
+def test_metrics_endpoint_reports_operations(client, manager):
+    client.post('/events', json={"title": "Timed", "start_time": "2030-01-01T09:00:00",
+                                 "end_time": "2030-01-01T10:00:00"})
+    client.get('/events')
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert 'event_manager_operation_seconds_count{operation="add_event"}' in text
+    assert 'http_requests_total{method="GET",endpoint="events.get_events",status="200"}' in text
+    assert 'email_queue_depth ' in text
+    assert client.get('/debug/profile').status_code == 404
+
+
+def test_create_app_defers_background_threads(manager):
+    app = app_module.create_app(manager, start_background=False)
+    services = app.extensions['event_scheduler']
+    assert services.event_manager is manager
+    assert services.reminder_scheduler._thread is None
+    app_module.start_background_tasks(app)
+    assert services.reminder_scheduler._thread.is_alive()
+    app_module.stop_background_tasks(app)
+    services.reminder_scheduler._thread.join(timeout=5)
+    assert not services.reminder_scheduler._thread.is_alive()
+
+
+def test_calendar_routes_use_separate_stores(manager, tmp_path):
+    calendars = ManagerRegistry(file_calendar_factory(str(tmp_path / 'calendars')))
+    client = app_module.create_app(manager, start_background=False, calendars=calendars).test_client()
+    event = {"title": "Team A sync", "start_time": "2030-01-01T09:00:00", "end_time": "2030-01-01T10:00:00"}
+
+    created = client.post('/calendars/team-a/events', json=event).get_json()
+    assert [e["title"] for e in client.get('/calendars/team-a/events').get_json()] == ["Team A sync"]
+    assert client.get(f'/calendars/team-a/events/{created["id"]}').status_code == 200
+    # Reads don't create calendars; the first POST does
+    assert client.get('/calendars/team-b/events').status_code == 404
+    assert not (tmp_path / 'calendars' / 'team-b.json').exists()
+    assert client.get('/events').get_json() == []
+    assert client.get('/calendars/bad.id/events').status_code == 400
+    # Reminders aren't scheduled for calendars, so an email would be silently ignored
+    with_email = dict(event, email="a@example.com")
+    assert client.post('/calendars/team-a/events', json=with_email).status_code == 400
+    assert client.put(f'/calendars/team-a/events/{created["id"]}', json={"email": "a@example.com"}).status_code == 400
+    bulk = client.post('/calendars/team-a/events/bulk', data=json.dumps(with_email), content_type='application/x-ndjson')
+    assert bulk.status_code == 400
+    assert client.get('/calendars/team-a/events/search?query=sync').get_json()[0]["id"] == created["id"]
+
+
+def test_events_and_search_stream_as_json_array_or_ndjson(client, manager):
+    for i in range(3):
+        manager.add_event(Event(f"Stream {i}", "", f"2030-01-0{i + 1}T09:00:00", f"2030-01-0{i + 1}T10:00:00"))
+
+    response = client.get('/events?stream=json')
+    assert response.is_streamed
+    assert [e["title"] for e in json.loads(response.get_data())] == ["Stream 0", "Stream 1", "Stream 2"]
+
+    response = client.get('/events', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line)["title"] for line in response.get_data(as_text=True).splitlines()] == [
+        "Stream 0", "Stream 1", "Stream 2"]
+
+    response = client.get('/events?stream=ndjson&from=2030-01-02T00:00:00&limit=1')
+    assert [json.loads(line)["title"] for line in response.get_data(as_text=True).splitlines()] == ["Stream 1"]
+
+    response = client.get('/events/search?query=stream&stream=json&limit=2')
+    assert len(json.loads(response.get_data())) == 2
+    assert client.get('/events?stream=xml').status_code == 400
+
+
+def test_streamed_range_must_be_bounded(client, manager):
+    manager.add_event(Event("Daily", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00", recurrence='daily'))
+    assert client.get('/events?stream=ndjson&from=2030-01-01T00:00:00').status_code == 400
+    assert client.get('/events?stream=ndjson&from=2030-01-01T00:00:00&to=2040-01-01T00:00:00').status_code == 400
+    response = client.get('/events?stream=ndjson&from=2030-01-01T00:00:00&to=2030-01-04T00:00:00')
+    assert len(response.get_data(as_text=True).splitlines()) == 3
+    response = client.get('/events?stream=ndjson&from=2030-01-01T00:00:00&limit=5')
+    assert len(response.get_data(as_text=True).splitlines()) == 5
+
+
+def test_streamed_empty_listing_is_valid_json(client):
+    assert json.loads(client.get('/events?stream=json').get_data()) == []
+
+
+def test_asgi_app_serves_routes(manager):
+    pytest.importorskip('asgiref')
+    import asyncio
+    import asgi
+
+    application = asgi.create_asgi_app(manager, start_background=False)
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "path": "/events", "raw_path": b"/events",
+             "query_string": b"stream=json", "headers": [], "scheme": "http", "server": ("testserver", 80),
+             "client": ("127.0.0.1", 1234), "root_path": ""}
+    asyncio.run(application(scope, receive, send))
+    assert messages[0]["status"] == 200
+    assert json.loads(b"".join(m.get("body", b"") for m in messages[1:])) == []
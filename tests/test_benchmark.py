@@ -0,0 +1,28 @@
+import json
+from benchmark import DEFAULT_MIX, generate_events, main, parse_mix, run_benchmarks
+
+
+def test_generate_events_is_seeded():
+    mix = parse_mix("none=0.5,weekly=0.5")
+    first = [e.to_dict() for e in generate_events(50, mix, seed=3)]
+    assert first == [e.to_dict() for e in generate_events(50, mix, seed=3)]
+    assert {e["recurrence"] for e in first} == {"none", "weekly"}
+
+
+def test_run_benchmarks_reports_every_operation():
+    results = run_benchmarks([30], parse_mix(DEFAULT_MIX), repeat=2, fsync=False)
+    operations = {result["operation"] for result in results}
+    assert {"manager.load", "manager.get_all_events", "event.next_occurrence", "GET /events",
+            "GET /events (cached)"} <= operations
+    for result in results:
+        assert result["size"] == 30
+        assert result["p50_ms"] <= result["p99_ms"]
+        assert result["peak_memory_bytes"] >= 0
+
+
+def test_main_writes_json(tmp_path):
+    output = tmp_path / 'bench.json'
+    main(['--sizes', '10', '--repeat', '1', '--no-routes', '--no-fsync', '--output', str(output)])
+    report = json.loads(output.read_text())
+    assert report["meta"]["args"]["sizes"] == '10'
+    assert report["results"]
@@ -0,0 +1,120 @@
+import threading
+import pytest
+from calendar_registry import ManagerRegistry, file_calendar_factory
+from event import Event
+
+
+def test_calendars_are_stored_separately(tmp_path):
+    registry = ManagerRegistry(file_calendar_factory(str(tmp_path)))
+    with registry.open("team-a") as team_a:
+        team_a.add_event(Event("A only", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00"))
+    with registry.open("team-b") as team_b:
+        assert team_b.events == []
+    registry.close()
+    assert (tmp_path / "team-a.json").exists()
+    assert registry.acquire("missing", create=False) is None
+    assert not (tmp_path / "missing.json").exists() and "missing" not in registry
+    with pytest.raises(ValueError):
+        file_calendar_factory(str(tmp_path))("../escape")
+
+
+def test_evicts_least_recently_used_idle_calendar(tmp_path):
+    closed = []
+
+    class Manager:
+        def __init__(self, calendar_id, create=True):
+            self.calendar_id = calendar_id
+
+        def close(self):
+            closed.append(self.calendar_id)
+
+    registry = ManagerRegistry(Manager, max_open=2)
+    with registry.open("a"), registry.open("b"):
+        pass
+    registry.acquire("a")  # "a" is now both most recent and in use
+    with registry.open("c"):
+        pass
+    assert closed == ["b"]
+    with registry.open("d"):
+        # "a" is still held, so the limit is exceeded rather than closing it
+        assert "a" in registry
+    assert closed == ["b", "c"]
+    registry.release("a")
+    with registry.open("e"):
+        pass
+    assert closed == ["b", "c", "a"]
+    assert len(registry) == 2
+
+
+def test_reopened_calendar_reloads_from_disk(tmp_path):
+    registry = ManagerRegistry(file_calendar_factory(str(tmp_path)), max_open=1)
+    with registry.open("one") as one:
+        event = one.add_event(Event("Persisted", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00"))
+    with registry.open("two"):
+        pass
+    assert "one" not in registry
+    with registry.open("one") as one:
+        assert one.get_event(event.id).title == "Persisted"
+
+
+def test_slow_open_and_close_do_not_block_other_calendars():
+    closing, opening = threading.Event(), threading.Event()
+    release_close, release_open = threading.Event(), threading.Event()
+
+    class Manager:
+        def __init__(self, calendar_id, create=True):
+            if calendar_id == "slow-open":
+                opening.set()
+                release_open.wait(5)
+
+        def close(self):
+            closing.set()
+            release_close.wait(5)
+
+    registry = ManagerRegistry(Manager, max_open=1)
+    with registry.open("a"):
+        pass
+    # Opening "b" evicts "a", whose close blocks
+    evicting = threading.Thread(target=lambda: registry.open("b").__enter__())
+    evicting.start()
+    assert closing.wait(5)
+    slow = threading.Thread(target=lambda: registry.acquire("slow-open"))
+    slow.start()
+    assert opening.wait(5)
+    # Neither the pending close nor the pending open holds the registry lock
+    with registry.open("c"):
+        assert "c" in registry
+        release_open.set()
+        release_close.set()
+    evicting.join(5)
+    slow.join(5)
+    assert not evicting.is_alive() and not slow.is_alive()
+
+
+def test_calendar_is_reopened_only_after_its_close_finishes():
+    log = []
+    closing, release_close = threading.Event(), threading.Event()
+
+    class Manager:
+        def __init__(self, calendar_id, create=True):
+            log.append(("open", calendar_id))
+
+        def close(self):
+            closing.set()
+            release_close.wait(5)
+            log.append(("closed",))
+
+    registry = ManagerRegistry(Manager, max_open=1)
+    with registry.open("a"):
+        pass
+    evicting = threading.Thread(target=lambda: registry.acquire("b"))
+    evicting.start()
+    assert closing.wait(5)
+    reopening = threading.Thread(target=lambda: registry.acquire("a"))
+    reopening.start()
+    reopening.join(0.1)
+    assert log == [("open", "a"), ("open", "b")]
+    release_close.set()
+    evicting.join(5)
+    reopening.join(5)
+    assert log == [("open", "a"), ("open", "b"), ("closed",), ("open", "a")]
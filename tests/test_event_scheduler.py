@@ -8,16 +8,19 @@ from event_manager import EventManager
 # Define a test storage file
 TEST_STORAGE_FILE = 'test_events.json'
 
+def _remove_storage_files():
+    for path in (TEST_STORAGE_FILE, TEST_STORAGE_FILE + '.journal', TEST_STORAGE_FILE + '.journal.old'):
+        if os.path.exists(path):
+            os.remove(path)
+
 # Fixture to set up and tear down a clean EventManager for each test
 @pytest.fixture
 def manager():
     # Ensure the test file is clean before each test
-    if os.path.exists(TEST_STORAGE_FILE):
-        os.remove(TEST_STORAGE_FILE)
+    _remove_storage_files()
     yield EventManager(TEST_STORAGE_FILE)
     # Clean up after each test
-    if os.path.exists(TEST_STORAGE_FILE):
-        os.remove(TEST_STORAGE_FILE)
+    _remove_storage_files()
 
 # --- Test Event Class ---
 def test_event_creation_valid():
@@ -181,4 +184,180 @@ def test_persistence(manager):
     assert len(loaded_events) == 2
     assert loaded_events[0].title == "Persistent Event 1"
     assert loaded_events[1].title == "Persistent Event 2"
-    assert os.path.exists(TEST_STORAGE_FILE)
\ No newline at end of file
+    assert os.path.exists(TEST_STORAGE_FILE)
+def test_update_event_reorders_index(manager):
+    now = datetime.now()
+    early = Event("Early", "Desc", (now + timedelta(hours=1)).isoformat(), (now + timedelta(hours=2)).isoformat())
+    late = Event("Late", "Desc", (now + timedelta(hours=3)).isoformat(), (now + timedelta(hours=4)).isoformat())
+    manager.add_event(early)
+    manager.add_event(late)
+    manager.update_event(early.id, {"start_time": (now + timedelta(hours=5)).isoformat(),
+                                    "end_time": (now + timedelta(hours=6)).isoformat()})
+    assert [e.title for e in manager.get_all_events()] == ["Late", "Early"]
+
+def test_failed_update_leaves_event_untouched(manager):
+    start_time = (datetime.now() + timedelta(days=1)).isoformat()
+    end_time = (datetime.now() + timedelta(days=1, hours=1)).isoformat()
+    event = manager.add_event(Event("Untouched", "Desc", start_time, end_time))
+    with pytest.raises(ValueError):
+        manager.update_event(event.id, {"title": "Changed", "end_time": "bad-time"})
+    assert manager.get_event(event.id).title == "Untouched"
+
+def test_get_events_between(manager):
+    base = datetime(2030, 1, 1, 9, 0)
+    inside = Event("Inside", "", base.isoformat(), (base + timedelta(hours=1)).isoformat(), event_id="b-inside")
+    overlapping = Event("Overlapping", "", (base - timedelta(hours=2)).isoformat(), (base + timedelta(minutes=30)).isoformat())
+    outside = Event("Outside", "", (base + timedelta(days=3)).isoformat(), (base + timedelta(days=3, hours=1)).isoformat())
+    daily = Event("Daily", "", (base - timedelta(days=10)).isoformat(), (base - timedelta(days=10) + timedelta(hours=1)).isoformat(),
+                  event_id="a-daily", recurrence='daily')
+    for event in (inside, overlapping, outside, daily):
+        manager.add_event(event)
+
+    window = manager.get_events_between(base, base + timedelta(days=2))
+    assert [e.title for e in window] == ["Overlapping", "Daily", "Inside", "Daily"]
+    assert window[1].start_time == base.isoformat()
+
+def test_window_scans_are_bounded_per_duration_group(manager):
+    import random
+    rng = random.Random(1)
+    base = datetime(2030, 1, 1)
+    events = []
+    for i in range(300):
+        start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 30))
+        duration = timedelta(minutes=rng.choice((1, 30, 90, 60 * 26, 60 * 24 * 9)))
+        events.append(Event(f"E{i}", "", start.isoformat(), (start + duration).isoformat()))
+    manager.add_events(events)
+    year = manager.add_event(Event("Year", "", base.isoformat(), (base + timedelta(days=365)).isoformat()))
+    for day in (0, 5, 20, 40):
+        window = (base + timedelta(days=day, hours=3), base + timedelta(days=day, hours=5))
+        expected = sorted((e.start, e.id) for e in events + [year] if e.start < window[1] and e.end > window[0])
+        assert [(e.start, e.id) for e in manager.get_events_between(*window)] == expected
+
+    # Once the long event is gone, short windows stop reaching back a year for it
+    groups = len(manager._snapshot().by_duration)
+    manager.delete_event(year.id)
+    assert len(manager._snapshot().by_duration) == groups - 1
+
+def test_search_tracks_updates_and_deletes(manager):
+    start_time = (datetime.now() + timedelta(days=1)).isoformat()
+    end_time = (datetime.now() + timedelta(days=1, hours=1)).isoformat()
+    event = manager.add_event(Event("Budget review", "Quarterly numbers", start_time, end_time))
+    assert [e.id for e in manager.search("budg")] == [event.id]
+    manager.update_event(event.id, {"title": "Offsite"})
+    assert manager.search("budget") == []
+    assert [e.id for e in manager.search("offsite quarter")] == [event.id]
+    manager.delete_event(event.id)
+    assert manager.search("offsite") == []
+
+def test_event_keeps_parsed_times():
+    event = Event("Parsed", "Desc", "2030-01-01T09:00", "2030-01-01T10:00")
+    assert event.start == datetime(2030, 1, 1, 9, 0)
+    assert event.start_time == "2030-01-01T09:00:00"
+    event.end_time = "2030-01-01T11:30:00"
+    assert event.end == datetime(2030, 1, 1, 11, 30)
+    assert event.to_dict()["end_time"] == "2030-01-01T11:30:00"
+    assert not hasattr(event, '__dict__')
+
+def test_event_with_times_copies_series_fields():
+    event = Event("Series", "Desc", "2030-01-01T09:00:00", "2030-01-01T10:00:00", recurrence='daily', email="a@b.c")
+    copy = event.with_times(datetime(2030, 1, 5, 9, 0), datetime(2030, 1, 5, 10, 0))
+    assert copy.to_dict() == dict(event.to_dict(), start_time="2030-01-05T09:00:00", end_time="2030-01-05T10:00:00")
+    assert event.start_time == "2030-01-01T09:00:00"
+
+def test_concurrent_writers_and_readers(manager):
+    import threading
+    base = datetime.now() + timedelta(days=1)
+    errors = []
+    stop = threading.Event()
+
+    def writer(n):
+        try:
+            for i in range(50):
+                start = base + timedelta(minutes=i)
+                event = manager.add_event(Event(f"W{n}-{i}", "load", start.isoformat(),
+                                                (start + timedelta(minutes=30)).isoformat()))
+                manager.update_event(event.id, {"title": f"W{n}-{i} updated"})
+                if i % 2:
+                    manager.delete_event(event.id)
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            while not stop.is_set():
+                events = manager.get_all_events()
+                assert events == sorted(events, key=lambda e: (e.start, e.id))
+                list(manager.iter_range(base, base + timedelta(hours=1)))
+                manager.search("load")
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    writers = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert len(manager.get_all_events()) == 100
+    assert all(e.title.endswith("updated") for e in manager.get_all_events())
+    reloaded = EventManager(TEST_STORAGE_FILE)
+    assert sorted(e.id for e in reloaded.events) == sorted(e.id for e in manager.events)
+
+def test_find_conflicts_sweeps_expanded_series(manager):
+    base = datetime(2030, 1, 1, 9, 0)
+    manager.add_event(Event("Standup", "", base.isoformat(), (base + timedelta(minutes=30)).isoformat(),
+                            event_id="standup", recurrence='daily'))
+    manager.add_event(Event("Review", "", (base + timedelta(days=1, minutes=15)).isoformat(),
+                            (base + timedelta(days=1, hours=1)).isoformat(), event_id="review"))
+    manager.add_event(Event("Lunch", "", (base + timedelta(hours=3)).isoformat(),
+                            (base + timedelta(hours=4)).isoformat(), event_id="lunch"))
+
+    conflicts = manager.find_conflicts(base, base + timedelta(days=3))
+    assert [(a.id, b.id, a.start_time) for a, b in conflicts] == [
+        ("standup", "review", (base + timedelta(days=1)).isoformat())]
+
+def test_find_conflicts_with_checks_recurring_candidates(manager):
+    base = datetime(2030, 1, 1, 9, 0)
+    manager.add_event(Event("Offsite", "", (base + timedelta(days=14, minutes=45)).isoformat(),
+                            (base + timedelta(days=14, hours=5)).isoformat(), event_id="offsite"))
+    weekly = Event("Sync", "", base.isoformat(), (base + timedelta(hours=1)).isoformat(), recurrence='weekly')
+    assert [e.id for e in manager.find_conflicts_with(weekly)] == ["offsite"]
+    daily_late = Event("Late", "", (base + timedelta(hours=6)).isoformat(), (base + timedelta(hours=7)).isoformat(),
+                       recurrence='daily')
+    assert manager.find_conflicts_with(daily_late) == []
+
+    with pytest.raises(ValueError):
+        manager.add_event(weekly, reject_conflicts=True)
+    assert manager.get_event(weekly.id) is None
+    manager.add_event(daily_late, reject_conflicts=True)
+    assert manager.get_event(daily_late.id) is not None
+
+def test_find_free_slots(manager):
+    base = datetime(2030, 1, 1, 9, 0)
+    manager.add_event(Event("A", "", base.isoformat(), (base + timedelta(hours=1)).isoformat()))
+    manager.add_event(Event("B", "", (base + timedelta(minutes=30)).isoformat(), (base + timedelta(hours=2)).isoformat()))
+    manager.add_event(Event("C", "", (base + timedelta(hours=2, minutes=15)).isoformat(), (base + timedelta(hours=3)).isoformat()))
+
+    slots = manager.find_free_slots(timedelta(minutes=30), base - timedelta(hours=1), base + timedelta(hours=5))
+    assert slots == [(base - timedelta(hours=1), base), (base + timedelta(hours=3), base + timedelta(hours=5))]
+    assert manager.find_free_slots(timedelta(minutes=15), base, base + timedelta(hours=5), limit=1) == [
+        (base + timedelta(hours=2), base + timedelta(hours=2, minutes=15))]
+
+def test_recurring_expansions_come_from_occurrence_cache(manager):
+    base = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    series = manager.add_event(Event("Daily", "", base.isoformat(), (base + timedelta(hours=1)).isoformat(),
+                                     recurrence='daily'))
+    after = base + timedelta(days=3, hours=2)
+    first = manager.get_all_events(after=after)[0]
+    assert manager.get_all_events(after=after)[0] is first
+    assert manager.get_events_between(after, after + timedelta(days=1))[0] is first
+
+    manager.update_event(series.id, {"title": "Renamed"})
+    assert manager.get_all_events(after=after)[0].title == "Renamed"
+    manager.delete_event(series.id)
+    assert len(manager._occurrences) == 0
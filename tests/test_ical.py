@@ -0,0 +1,44 @@
+from datetime import datetime
+import pytest
+from event import Event
+from ical import event_to_vevent, iter_ics, parse_ics
+
+
+def test_round_trip_through_ics():
+    original = Event("Planning; Q3, part 1", "Line one\nLine two", "2030-01-31T09:00:00", "2030-01-31T10:30:00",
+                     event_id="uid-1", recurrence='monthly', email="team@example.com")
+    document = ''.join(iter_ics([original]))
+    assert document.startswith("BEGIN:VCALENDAR\r\n") and document.endswith("END:VCALENDAR\r\n")
+    parsed = list(parse_ics(document.splitlines(keepends=True)))
+    assert parsed == [original.to_dict()]
+
+
+def test_long_lines_are_folded_and_unfolded():
+    event = Event("x" * 200, "é" * 100, "2030-01-01T09:00:00", "2030-01-01T10:00:00")
+    vevent = event_to_vevent(event, stamp=datetime(2030, 1, 1))
+    assert all(len(line.encode('utf-8')) <= 75 for line in vevent.split("\r\n"))
+    parsed = next(parse_ics(vevent.splitlines(keepends=True)))
+    assert parsed["title"] == "x" * 200
+    assert parsed["description"] == "é" * 100
+
+
+def test_parse_date_only_and_params():
+    lines = [
+        "BEGIN:VCALENDAR",
+        "BEGIN:VEVENT",
+        "UID:all-day",
+        "SUMMARY:Holiday",
+        "DTSTART;VALUE=DATE:20300101",
+        "DTEND;VALUE=DATE:20300102",
+        "RRULE:FREQ=WEEKLY;WKST=MO",
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    assert list(parse_ics(lines)) == [{"id": "all-day", "title": "Holiday", "start_time": "2030-01-01T00:00:00",
+                                       "end_time": "2030-01-02T00:00:00", "recurrence": "weekly"}]
+
+
+def test_unsupported_rrule_is_rejected():
+    lines = ["BEGIN:VEVENT", "SUMMARY:Yearly", "RRULE:FREQ=YEARLY", "END:VEVENT"]
+    with pytest.raises(ValueError, match="Unsupported RRULE"):
+        list(parse_ics(lines))
@@ -0,0 +1,60 @@
+import threading
+import time
+from metrics import Counter, Gauge, Histogram, Registry, SamplingProfiler
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    requests = Counter('requests_total', "Requests.", ['method'], registry=registry)
+    depth = Gauge('queue_depth', "Depth.", registry=registry)
+    latency = Histogram('latency_seconds', "Latency.", buckets=(0.1, 1.0), registry=registry)
+    for metric in (requests, depth, latency):
+        registry.register(metric)
+    requests.inc(method='GET')
+    requests.inc(2, method='GET')
+    depth.set_function(lambda: 7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    text = registry.render()
+    assert '# TYPE requests_total counter\nrequests_total{method="GET"} 3\n' in text
+    assert 'queue_depth 7\n' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3\n' in text
+    assert 'latency_seconds_count 3\n' in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+    latency = Histogram('latency_seconds', "Latency.", ['operation'], registry=registry)
+
+    @latency.timed(operation='work')
+    def work():
+        return 42
+
+    assert work() == 42
+    assert latency.count(operation='work') == 0
+    registry.enabled = True
+    work()
+    assert latency.count(operation='work') == 1
+
+
+def test_sampling_profiler_collects_stacks():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker)
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    time.sleep(0.05)
+    profiler.stop()
+    stop.set()
+    worker.join()
+    assert 'busy_worker' in profiler.collapsed()
+    assert not profiler.running
@@ -0,0 +1,86 @@
+import smtplib
+import threading
+from notifications import EmailDispatcher, SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Stand-in for an authenticated smtplib.SMTP connection."""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.closed = False
+
+    def sendmail(self, sender, recipients, message):
+        if self.sink['failures'] < self.sink['fail_times']:
+            self.sink['failures'] += 1
+            raise smtplib.SMTPServerDisconnected("connection dropped")
+        with self.sink['lock']:
+            self.sink['sent'].append((recipients[0], message))
+
+    def quit(self):
+        self.closed = True
+
+
+def _sink(fail_times=0):
+    return {'sent': [], 'connections': 0, 'failures': 0, 'fail_times': fail_times, 'lock': threading.Lock()}
+
+
+def _pool(sink, size=2):
+    def connect():
+        with sink['lock']:
+            sink['connections'] += 1
+        return FakeSMTP(sink)
+    return SMTPConnectionPool(connect, size=size)
+
+
+def test_connections_are_reused():
+    sink = _sink()
+    dispatcher = EmailDispatcher(_pool(sink, size=2), 'from@example.com', workers=2, batch_size=1)
+    dispatcher.start()
+    for i in range(20):
+        dispatcher.send(f'user{i}@example.com', 'Reminder', 'Body')
+    dispatcher.join()
+    dispatcher.stop()
+    assert len(sink['sent']) == 20
+    assert sink['connections'] <= 2
+
+
+def test_messages_for_same_recipient_are_batched():
+    sink = _sink()
+    dispatcher = EmailDispatcher(_pool(sink), 'from@example.com', workers=1)
+    dispatcher.send('a@example.com', 'Reminder: Standup', 'Standup at 9')
+    dispatcher.send('b@example.com', 'Reminder: Lunch', 'Lunch at 12')
+    dispatcher.send('a@example.com', 'Reminder: Review', 'Review at 10')
+    dispatcher.start()
+    dispatcher.join()
+    dispatcher.stop()
+    recipients = [to for to, _ in sink['sent']]
+    assert recipients == ['a@example.com', 'b@example.com']
+    digest = sink['sent'][0][1]
+    assert 'Subject: 2 reminders' in digest
+    assert 'Standup at 9' in digest and 'Review at 10' in digest
+
+
+def test_failed_send_is_retried_with_backoff():
+    sink = _sink(fail_times=2)
+    delays = []
+    dispatcher = EmailDispatcher(_pool(sink), 'from@example.com', workers=1, backoff=0.5, sleep=delays.append)
+    dispatcher.start()
+    dispatcher.send('a@example.com', 'Reminder', 'Body')
+    dispatcher.join()
+    dispatcher.stop()
+    assert len(sink['sent']) == 1
+    assert delays == [0.5, 1.0]
+    # Each failure discards the broken connection and dials a new one
+    assert sink['connections'] == 3
+
+
+def test_gives_up_after_max_retries(capsys):
+    sink = _sink(fail_times=10)
+    dispatcher = EmailDispatcher(_pool(sink), 'from@example.com', workers=1, max_retries=1, sleep=lambda _: None)
+    dispatcher.start()
+    dispatcher.send('a@example.com', 'Reminder', 'Body')
+    dispatcher.join()
+    dispatcher.stop()
+    assert sink['sent'] == []
+    assert "Failed to send email to a@example.com" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from event import Event
+from occurrence_cache import OccurrenceCache
+
+
+def _daily(title="Daily", start=datetime(2030, 1, 1, 9, 0), **kwargs):
+    return Event(title, "", start.isoformat(), (start + timedelta(hours=1)).isoformat(), recurrence='daily', **kwargs)
+
+
+def _clock(now):
+    # A clock that tests can move forward by assigning to now[0]
+    return lambda: now[0]
+
+
+def test_reads_reuse_materialized_occurrences():
+    after = datetime(2030, 2, 1, 12, 0)
+    cache = OccurrenceCache(clock=_clock([after]))
+    event = _daily()
+    first = cache.next_occurrence(event, after)
+    assert first.start == datetime(2030, 2, 2, 9, 0)
+    assert cache.next_occurrence(event, after) is first
+    # Only what the read needed was materialized
+    assert len(cache._entries[event.id].starts) == 1
+    window = list(cache.occurrences(event, after, after + timedelta(days=3)))
+    assert window[0] is first
+    assert [e.start.day for e in window] == [2, 3, 4]
+
+
+def test_matches_direct_expansion_inside_and_outside_horizon():
+    cache = OccurrenceCache(horizon=timedelta(days=10), clock=_clock([datetime(2030, 1, 5, 9, 30)]))
+    event = _daily()
+    for window_start, days in ((datetime(2030, 1, 5, 9, 30), 5), (datetime(2030, 1, 5, 9, 30), 40),
+                               (datetime(2029, 12, 1), 3), (datetime(2030, 1, 5, 9, 45), 9)):
+        window_end = window_start + timedelta(days=days)
+        expected = list(event.occurrences(window_start, window_end))
+        assert [(e.start, e.end) for e in cache.occurrences(event, window_start, window_end)] == expected
+    for after in (datetime(2030, 1, 5, 9, 30), datetime(2030, 1, 12, 8, 0), datetime(2030, 3, 1)):
+        assert cache.next_occurrence(event, after).start == event.next_occurrence(after)[0]
+
+
+def test_reads_far_from_now_leave_the_cache_alone():
+    now = [datetime(2030, 1, 5, 12, 0)]
+    cache = OccurrenceCache(horizon=timedelta(days=10), clock=_clock(now))
+    event = _daily()
+    upcoming = cache.next_occurrence(event, now[0])
+    far = list(cache.occurrences(event, now[0] + timedelta(days=30), now[0] + timedelta(days=60)))
+    assert len(far) == 30
+    entry = cache._entries[event.id]
+    assert entry.base == now[0] and entry.starts == [upcoming.start]
+    assert cache.next_occurrence(event, now[0]) is upcoming
+
+
+def test_advances_with_the_clock_and_invalidates_per_id():
+    now = [datetime(2030, 1, 5, 12, 0)]
+    cache = OccurrenceCache(horizon=timedelta(days=10), step=timedelta(days=1), clock=_clock(now))
+    event = _daily(event_id="series")
+    upcoming = list(cache.occurrences(event, now[0], datetime(2030, 1, 9)))
+    assert [e.start.day for e in upcoming] == [6, 7, 8]
+    # Two days later the past is dropped and the still-upcoming objects are kept
+    now[0] = datetime(2030, 1, 7, 12, 0)
+    assert cache.next_occurrence(event, now[0]) is upcoming[-1]
+    assert cache.next_occurrence(event, datetime(2030, 1, 8, 12, 0)).start == datetime(2030, 1, 9, 9, 0)
+    assert [s.day for s in cache._entries["series"].starts] == [8, 9]
+
+    renamed = _daily("Renamed", event_id="series")
+    assert cache.next_occurrence(renamed, now[0]).title == "Renamed"
+    cache.invalidate("series")
+    assert len(cache) == 0
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from event import Event
+from recurrence import add_months, next_occurrence, occurrences
+
+
+def test_next_occurrence_daily_is_closed_form():
+    start = datetime(2020, 1, 1, 9, 0)
+    end = start + timedelta(hours=1)
+    after = datetime(2025, 6, 15, 12, 0)
+    assert next_occurrence(start, end, 'daily', after) == (datetime(2025, 6, 16, 9, 0), datetime(2025, 6, 16, 10, 0))
+    # An occurrence starting exactly at 'after' is not "next"
+    assert next_occurrence(start, end, 'daily', datetime(2025, 6, 15, 9, 0))[0] == datetime(2025, 6, 16, 9, 0)
+
+
+def test_next_occurrence_weekly_keeps_weekday():
+    start = datetime(2024, 1, 1, 9, 0)  # a Monday
+    occ = next_occurrence(start, start + timedelta(hours=1), 'weekly', datetime(2024, 3, 6))
+    assert occ[0] == datetime(2024, 3, 11, 9, 0)
+
+
+def test_monthly_uses_calendar_months():
+    start = datetime(2024, 1, 31, 9, 0)
+    assert add_months(start, 1) == datetime(2024, 2, 29, 9, 0)
+    assert add_months(start, 2) == datetime(2024, 3, 31, 9, 0)
+    occ = next_occurrence(start, start + timedelta(hours=1), 'monthly', datetime(2024, 4, 1))
+    assert occ == (datetime(2024, 4, 30, 9, 0), datetime(2024, 4, 30, 10, 0))
+
+
+def test_non_recurring_and_unknown_recurrence():
+    start = datetime(2030, 1, 1, 9, 0)
+    end = start + timedelta(hours=1)
+    assert next_occurrence(start, end, 'none', datetime(2029, 1, 1)) == (start, end)
+    assert next_occurrence(start, end, 'none', datetime(2031, 1, 1)) is None
+    assert next_occurrence(start, end, 'yearly', datetime(2031, 1, 1)) is None
+
+
+def test_occurrences_in_window():
+    start = datetime(2024, 1, 1, 23, 0)
+    end = start + timedelta(hours=2)
+    window = list(occurrences(start, end, 'daily', datetime(2024, 1, 10), datetime(2024, 1, 12)))
+    # The occurrence starting on the 9th runs past midnight into the window
+    assert [s.day for s, _ in window] == [9, 10, 11]
+    assert list(occurrences(start, end, 'daily', datetime(2023, 1, 1), datetime(2023, 2, 1))) == []
+
+
+def test_event_occurrences_delegates_to_engine():
+    event = Event("Standup", "", "2024-01-01T09:00:00", "2024-01-01T09:15:00", recurrence='weekly')
+    window = list(event.occurrences(datetime(2024, 1, 1), datetime(2024, 1, 22)))
+    assert [s.isoformat() for s, _ in window] == ["2024-01-01T09:00:00", "2024-01-08T09:00:00", "2024-01-15T09:00:00"]
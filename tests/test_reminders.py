@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import pytest
+from event import Event
+from event_manager import EventManager
+from reminders import ReminderScheduler
+
+NOW = datetime(2030, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return EventManager(str(tmp_path / 'events.json'))
+
+
+def _scheduler(manager, fired):
+    return ReminderScheduler(manager, lambda event, start, end: fired.append((event.title, start)),
+                             clock=lambda: NOW)
+
+
+def _event(title, start, recurrence='none'):
+    return Event(title, "", start.isoformat(), (start + timedelta(minutes=30)).isoformat(), recurrence=recurrence)
+
+
+def test_reminder_fires_once_within_lead(manager):
+    manager.add_event(_event("Soon", NOW + timedelta(minutes=90)))
+    fired = []
+    scheduler = _scheduler(manager, fired)
+    assert scheduler.run_pending(NOW) == []
+    scheduler.run_pending(NOW + timedelta(minutes=31))
+    scheduler.run_pending(NOW + timedelta(minutes=45))
+    assert fired == [("Soon", NOW + timedelta(minutes=90))]
+    assert scheduler.pending == 0
+
+
+def test_recurring_event_is_rescheduled(manager):
+    manager.add_event(_event("Daily", NOW + timedelta(minutes=30), recurrence='daily'))
+    fired = []
+    scheduler = _scheduler(manager, fired)
+    scheduler.run_pending(NOW)
+    scheduler.run_pending(NOW + timedelta(days=1))
+    assert [start for _, start in fired] == [NOW + timedelta(minutes=30), NOW + timedelta(days=1, minutes=30)]
+    assert scheduler.pending == 1
+
+
+def test_manager_changes_reschedule(manager):
+    fired = []
+    scheduler = _scheduler(manager, fired)
+    moved = manager.add_event(_event("Moved", NOW + timedelta(minutes=30)))
+    deleted = manager.add_event(_event("Deleted", NOW + timedelta(minutes=40)))
+    manager.update_event(moved.id, {"start_time": (NOW + timedelta(hours=5)).isoformat(),
+                                    "end_time": (NOW + timedelta(hours=6)).isoformat()})
+    manager.delete_event(deleted.id)
+    scheduler.run_pending(NOW)
+    assert fired == []
+    scheduler.run_pending(NOW + timedelta(hours=4, minutes=1))
+    assert fired == [("Moved", NOW + timedelta(hours=5))]
+
+
+def test_update_after_reminder_does_not_repeat_it(manager):
+    event = manager.add_event(_event("Renamed", NOW + timedelta(minutes=30)))
+    fired = []
+    scheduler = _scheduler(manager, fired)
+    scheduler.run_pending(NOW)
+    manager.update_event(event.id, {"title": "Renamed again"})
+    scheduler.run_pending(NOW + timedelta(minutes=1))
+    assert len(fired) == 1
+
+
+def test_failing_reminder_does_not_stop_the_others(manager):
+    manager.add_event(_event("Broken", NOW + timedelta(minutes=30)))
+    manager.add_event(_event("Fine", NOW + timedelta(minutes=40)))
+    fired = []
+
+    def on_reminder(event, start, end):
+        if event.title == "Broken":
+            raise RuntimeError("boom")
+        fired.append(event.title)
+
+    scheduler = ReminderScheduler(manager, on_reminder, clock=lambda: NOW)
+    assert len(scheduler.run_pending(NOW)) == 2
+    assert fired == ["Fine"]
+
+
+def test_failing_listener_does_not_fail_the_write(manager):
+    seen = []
+    manager.add_listener(lambda action, event: 1 / 0)
+    manager.add_listener(lambda action, event: seen.append(action))
+    event = manager.add_event(_event("Stored", NOW + timedelta(hours=3)))
+    assert manager.get_event(event.id) is event
+    assert seen == ["add"]
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+from response_cache import ResponseCache
+
+
+def test_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    now = datetime(2030, 1, 1)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    assert cache.get('a', now).body == b'1'
+    cache.put('c', b'3')
+    assert cache.get('b', now) is None
+    assert cache.get('a', now) is not None and cache.get('c', now) is not None
+
+
+def test_entries_expire_and_etags_follow_body():
+    cache = ResponseCache()
+    now = datetime(2030, 1, 1)
+    entry = cache.put('a', b'body', expires=now + timedelta(minutes=5))
+    assert cache.get('a', now).etag == entry.etag
+    assert cache.get('a', now + timedelta(minutes=5)) is None
+    assert cache.put('b', b'body').etag == entry.etag
+    assert cache.put('c', b'other').etag != entry.etag
@@ -0,0 +1,39 @@
+from event import Event
+from search_index import SearchIndex, tokenize
+
+
+def _event(title, description="", event_id=None):
+    return Event(title, description, "2030-01-01T09:00:00", "2030-01-01T10:00:00", event_id=event_id)
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("Team-Meeting: Q3 roadmap!") == ["team", "meeting", "q3", "roadmap"]
+    assert tokenize(None) == []
+
+
+def test_prefix_match_requires_all_terms():
+    index = SearchIndex()
+    index.add(_event("Team meeting", "Discuss roadmap", event_id="a"))
+    index.add(_event("Team lunch", event_id="b"))
+    assert index.search("tea") == ["a", "b"]
+    assert index.search("team road") == ["a"]
+    assert index.search("team dinner") == []
+
+
+def test_ranking_prefers_title_and_exact_matches():
+    index = SearchIndex()
+    index.add(_event("Reviewers sync", event_id="prefix"))
+    index.add(_event("Planning", "release notes", event_id="description"))
+    index.add(_event("Review", event_id="title"))
+    index.add(_event("Release", event_id="release"))
+    assert index.search("review") == ["title", "prefix"]
+    assert index.search("release") == ["release", "description"]
+    assert index.search("review", limit=1) == ["title"]
+
+
+def test_remove_drops_event_and_unused_tokens():
+    index = SearchIndex()
+    index.add(_event("Unique gathering", event_id="a"))
+    index.remove("a")
+    assert index.search("unique") == []
+    assert index._vocabulary == []
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from event import Event
+from event_manager import EventManager
+from sqlite_event_manager import SQLiteEventManager, migrate_json_to_sqlite
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = SQLiteEventManager(str(tmp_path / 'events.db'))
+    yield manager
+    manager.close()
+
+
+def _event(title, start, hours=1, **kwargs):
+    return Event(title, kwargs.pop('description', ""), start.isoformat(),
+                 (start + timedelta(hours=hours)).isoformat(), **kwargs)
+
+
+def test_crud_round_trip(manager):
+    event = manager.add_event(_event("Stored", datetime(2030, 1, 1, 9)))
+    assert manager.get_event(event.id).title == "Stored"
+    manager.update_event(event.id, {"title": "Renamed"})
+    assert manager.get_event(event.id).title == "Renamed"
+    with pytest.raises(ValueError):
+        manager.update_event(event.id, {"end_time": "bad-time"})
+    assert manager.delete_event(event.id) is True
+    assert manager.get_event(event.id) is None
+    assert manager.delete_event(event.id) is False
+
+
+def test_database_uses_wal(manager):
+    assert manager._conn().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_range_query_matches_in_memory_manager(manager, tmp_path):
+    memory = EventManager(str(tmp_path / 'events.json'))
+    base = datetime(2030, 1, 1, 9)
+    events = [
+        _event("Long", base - timedelta(days=2), hours=60),
+        _event("Inside", base + timedelta(days=1), event_id="b"),
+        _event("Weekly", base - timedelta(days=14), recurrence='weekly', event_id="a"),
+        _event("Outside", base + timedelta(days=30)),
+    ]
+    for event in events:
+        manager.add_event(event)
+        memory.add_event(Event.from_dict(event.to_dict()))
+
+    window = (base, base + timedelta(days=8))
+    expected = [(e.title, e.start_time) for e in memory.iter_range(*window)]
+    assert [(e.title, e.start_time) for e in manager.iter_range(*window)] == expected
+    assert [e.title for e in manager.get_all_events(after=base)] == [e.title for e in memory.get_all_events(after=base)]
+    after_key = (datetime.fromisoformat(expected[1][1]), "a")
+    assert [e.title for e in manager.iter_range(*window, after_key=after_key)] == ["Inside", "Weekly"]
+
+
+def test_window_from_year_one_does_not_overflow(manager, tmp_path):
+    memory = EventManager(str(tmp_path / 'events.json'))
+    for store in (manager, memory):
+        store.add_event(_event("Long", datetime(2030, 1, 1, 9), hours=24 * 365))
+        store.add_event(_event("Daily", datetime(2030, 1, 1, 9), recurrence='daily'))
+        titles = sorted(e.title for e in store.get_events_between(datetime.min, datetime(2030, 1, 2)))
+        assert titles == ["Daily", "Long"]
+
+
+def test_search_is_pushed_down_to_fts(manager):
+    manager.add_event(_event("Budget review", datetime(2030, 1, 1, 9), description="numbers"))
+    manager.add_event(_event("Lunch", datetime(2030, 1, 1, 12), description="review menu"))
+    assert [e.title for e in manager.search("review")] == ["Budget review", "Lunch"]
+    assert [e.title for e in manager.search("budg num")] == ["Budget review"]
+    assert manager.search("dinner") == []
+
+
+def test_migrate_json_to_sqlite(tmp_path):
+    json_path = str(tmp_path / 'events.json')
+    db_path = str(tmp_path / 'events.db')
+    source = EventManager(json_path)
+    snapshot = source.add_event(_event("From snapshot", datetime(2030, 1, 1, 9)))
+    source._save_events()
+    journaled = source.add_event(_event("From journal", datetime(2030, 1, 2, 9)))
+
+    assert migrate_json_to_sqlite(json_path, db_path) == 2
+    migrated = SQLiteEventManager(db_path)
+    assert migrated.get_event(snapshot.id).to_dict() == snapshot.to_dict()
+    assert migrated.get_event(journaled.id).to_dict() == journaled.to_dict()
+    with open(json_path) as f:
+        assert len(json.load(f)) == 1
+
+
+def test_migration_rerun_replaces_rows(tmp_path):
+    json_path = str(tmp_path / 'events.json')
+    db_path = str(tmp_path / 'events.db')
+    source = EventManager(json_path)
+    event = source.add_event(_event("Original", datetime(2030, 1, 1, 9)))
+    migrate_json_to_sqlite(json_path, db_path)
+    source.update_event(event.id, {"title": "Changed"})
+    migrate_json_to_sqlite(json_path, db_path)
+    migrated = SQLiteEventManager(db_path)
+    assert [e.title for e in migrated.events] == ["Changed"]
+    assert migrated.search("original") == []
+
+
+def test_version_changes_on_writes_from_any_connection(manager, tmp_path):
+    before = manager.version
+    other = SQLiteEventManager(str(tmp_path / 'events.db'))
+    event = other.add_event(_event("Elsewhere", datetime(2030, 1, 1, 9)))
+    after_add = manager.version
+    assert after_add != before
+    other.delete_event(event.id)
+    assert manager.version != after_add
+    other.close()
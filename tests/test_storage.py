@@ -0,0 +1,152 @@
+import json
+import os
+from datetime import datetime, timedelta
+from event import Event
+from event_manager import EventManager
+from storage import JournalStorage, JsonFileStorage
+
+
+def _event(title, days=1):
+    start = datetime.now() + timedelta(days=days)
+    return Event(title, "Desc", start.isoformat(), (start + timedelta(hours=1)).isoformat())
+
+
+def test_journal_appends_instead_of_rewriting(tmp_path):
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path)
+    manager.add_event(_event("Journaled"))
+    with open(path) as f:
+        assert json.load(f) == []
+    with open(path + '.journal') as f:
+        lines = f.readlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["event"]["title"] == "Journaled"
+
+
+def test_journal_replay_after_crash(tmp_path):
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path)
+    kept = manager.add_event(_event("Kept"))
+    gone = manager.add_event(_event("Gone", days=2))
+    manager.update_event(kept.id, {"title": "Kept Updated"})
+    manager.delete_event(gone.id)
+    # Simulate a crash in the middle of appending the next record
+    with open(path + '.journal', 'a') as f:
+        f.write('{"op": "put", "event": {"id": "torn"')
+
+    reloaded = EventManager(path)
+    assert [e.title for e in reloaded.get_all_events()] == ["Kept Updated"]
+
+
+def test_compaction_writes_plain_json_snapshot(tmp_path):
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path, storage=JournalStorage(path, compact_threshold=10 ** 6))
+    event = manager.add_event(_event("Snapshot"))
+    manager.storage.compact()
+    with open(path) as f:
+        assert json.load(f) == [event.to_dict()]
+    assert not os.path.exists(path + '.journal.old')
+    assert [e.id for e in EventManager(path).get_all_events()] == [event.id]
+
+
+def test_appends_during_compaction_snapshot_build_are_kept(tmp_path):
+    path = str(tmp_path / 'events.json')
+    storage = JournalStorage(path, compact_threshold=10 ** 6)
+    storage.load()
+    records = [{"id": "a", "title": "Before"}]
+
+    def source():
+        # A write landing while the records are built; it must not wait for the compaction
+        storage.put({"id": "b", "title": "During"})
+        return list(records)
+
+    storage.attach(source)
+    storage.put(records[0])
+    storage.compact()
+    with open(path) as f:
+        assert json.load(f) == records
+    assert sorted(record["id"] for record in JournalStorage(path).load()) == ["a", "b"]
+
+
+def test_interrupted_compaction_is_recovered(tmp_path):
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path)
+    first = manager.add_event(_event("First"))
+    # Crash after rotating the journal but before the snapshot was replaced
+    os.replace(path + '.journal', path + '.journal.old')
+    second_manager = EventManager(path)
+    second = second_manager.add_event(_event("Second", days=2))
+
+    reloaded = EventManager(path)
+    assert [e.id for e in reloaded.get_all_events()] == [first.id, second.id]
+    assert not os.path.exists(path + '.journal.old')
+
+
+def test_json_file_storage_rewrites_file(tmp_path):
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path, storage=JsonFileStorage(path))
+    event = manager.add_event(_event("Rewritten"))
+    with open(path) as f:
+        assert json.load(f) == [event.to_dict()]
+    assert not os.path.exists(path + '.journal')
+
+
+def test_streaming_snapshot_reader_handles_chunk_boundaries(tmp_path, monkeypatch):
+    import storage
+    path = str(tmp_path / 'events.json')
+    records = [_event(f"Event {i} " + "x" * i).to_dict() for i in range(50)]
+    storage._write_snapshot(path, records)
+    monkeypatch.setattr(storage, 'SNAPSHOT_CHUNK_SIZE', 64)
+    assert list(storage._iter_snapshot(path)) == records
+    with open(path, 'w') as f:
+        f.write('[{"id": "torn"')
+    assert storage._read_snapshot(path) == []
+
+
+def test_binary_snapshot_is_used_until_json_changes(tmp_path):
+    import storage
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path, storage=JournalStorage(path, binary_snapshot=True))
+    manager.add_event(_event("Fast"))
+    manager.close()
+    assert [r["title"] for r in storage._read_binary_snapshot(path)] == ["Fast"]
+    reloaded = EventManager(path, storage=JournalStorage(path, binary_snapshot=True))
+    assert [e.title for e in reloaded.events] == ["Fast"]
+
+    # A hand-edited snapshot makes the sidecar stale, and the JSON wins
+    storage._write_snapshot(path, [_event("Edited").to_dict()])
+    assert storage._read_binary_snapshot(path) is None
+    assert [e.title for e in EventManager(path, storage=JournalStorage(path, binary_snapshot=True)).events] == ["Edited"]
+
+
+def test_write_after_torn_journal_line_survives_restart(tmp_path):
+    path = str(tmp_path / 'events.json')
+    manager = EventManager(path)
+    first = manager.add_event(_event("First"))
+    with open(path + '.journal', 'a') as f:
+        f.write('{"op": "put", "event": {"id": "torn"')
+
+    recovered = EventManager(path)
+    second = recovered.add_event(_event("Second", days=2))
+
+    reloaded = EventManager(path)
+    assert [e.id for e in reloaded.get_all_events()] == [first.id, second.id]
+
+
+def test_snapshot_with_offset_aware_times_loads_as_local_time(tmp_path):
+    import storage
+    from datetime import timezone
+    path = str(tmp_path / 'events.json')
+    aware = datetime(2030, 1, 1, 8, 0, tzinfo=timezone.utc)
+    storage._write_snapshot(path, [
+        {"id": "aware", "title": "Aware", "description": "", "start_time": aware.isoformat(),
+         "end_time": (aware + timedelta(hours=1)).isoformat(), "recurrence": "none", "email": None},
+        _event("Naive").to_dict(),
+    ])
+    manager = EventManager(path)
+    loaded = manager.get_event("aware")
+    assert loaded.start == aware.astimezone().replace(tzinfo=None)
+    assert len(manager.get_all_events(after=datetime(2000, 1, 1))) == 2
+    # The reminder scheduler compares stored times with naive now
+    from reminders import ReminderScheduler
+    assert ReminderScheduler(manager, lambda *args: None).pending == 2